@@ -0,0 +1,367 @@
+# Capture-pipeline benchmarks. Runs headless on any Linux box:
+#
+#   python bench/capture.py [--fixture FILE.mjpeg ...] [--json OUT]
+#                           [--baseline OLD.json]
+#
+# Without --fixture, synthetic recordings are generated for the preview
+# and still sizes the upload screen uses. Real recordings are better for
+# absolute numbers (`rpicam-vid -t 10000 --codec mjpeg --width 320
+# --height 240 --quality 50 -o preview.mjpeg`) and can be mixed in.
+#
+# Stages:
+#   parser    MjpegFrameParser alone, for each chunk size and buffer cap
+#   decode    QImage decode, preview scaling and focus metrics per frame
+#   pipeline  CaptureWorker fed by a ReplaySource at each frame rate;
+#             latency is from a frame leaving the source to its decoded
+#             image being stored for the UI
+#
+# --json writes the results; --baseline compares frames/sec against an
+# earlier --json run and exits 1 when a case got slower than TOLERANCE.
+
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+from PySide6.QtCore import QBuffer, QByteArray, QEventLoop, QIODevice, Qt, QTimer
+from PySide6.QtGui import QImage
+from PySide6.QtWidgets import QApplication
+
+from services.camera import MAX_BUFFER, READ_SIZE, CaptureWorker, frame_metrics
+from services.camera_source import ReplaySource
+from services.mjpeg import MjpegFrameParser
+
+# name -> (width, height, quality, frames); preview sizes and qualities
+# match PREVIEW_STREAM and STILL in screens/upload.py
+FIXTURES = {
+    "preview-320x240-q50": (320, 240, 50, 120),
+    "preview-640x480-q75": (640, 480, 75, 120),
+    "still-2028x1520-q93": (2028, 1520, 93, 8),
+}
+
+CHUNK_SIZES = (4096, 16384, READ_SIZE, 262144)
+# Parser buffer caps to compare against the worker's MAX_BUFFER
+CAPACITIES = (1_000_000, MAX_BUFFER)
+FRAME_RATES = (20, 30, 0)
+PREVIEW_SIZE = (640, 480)
+
+PIPELINE_SECONDS = 3.0
+# Parser passes over each fixture, so small ones run long enough to time
+PARSER_BYTES = 20_000_000
+TRIALS = 3
+# Allowed frames/sec drop against --baseline
+TOLERANCE = 0.25
+
+
+# ==========================================================
+# FIXTURES
+# ==========================================================
+
+def synthetic_mjpeg(width, height, quality, frames, seed=0):
+    # Moving gradient plus sensor-like noise: compresses about like a
+    # camera frame, and every frame has different bytes.
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+
+    chunks = []
+    for i in range(frames):
+        luma = (x + y + i * 3) % 256
+        pixels = np.empty((height, width, 3), np.uint8)
+        for c, shift in enumerate((0, 40, 80)):
+            noise = rng.normal(0, 6, (height, width))
+            pixels[..., c] = np.clip(luma + shift + noise, 0, 255)
+
+        image = QImage(pixels.tobytes(), width, height, width * 3, QImage.Format_RGB888)
+        data = QByteArray()
+        buffer = QBuffer(data)
+        buffer.open(QIODevice.WriteOnly)
+        image.save(buffer, "JPG", quality)
+        chunks.append(data.data())
+
+    return b"".join(chunks)
+
+
+def load_fixtures(paths):
+    fixtures = {}
+
+    for path in paths:
+        with open(path, "rb") as f:
+            fixtures[os.path.basename(path)] = f.read()
+
+    if not paths:
+        for name, spec in FIXTURES.items():
+            fixtures[name] = synthetic_mjpeg(*spec)
+
+    return fixtures
+
+
+def split_frames(data):
+    return [bytes(f) for f in MjpegFrameParser(len(data) + 1).feed(data)]
+
+
+# ==========================================================
+# MEASUREMENT
+# ==========================================================
+
+def percentiles(values):
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+
+    values = sorted(values)
+    last = len(values) - 1
+    return {
+        f"p{p}": round(values[min(last, int(last * p / 100 + 0.5))], 3)
+        for p in (50, 95, 99)
+    }
+
+
+def reset_peak_rss():
+    # Linux lets a process reset its own high-water mark; elsewhere the
+    # figure is the peak of the whole run so far
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def ms(since):
+    return (time.perf_counter() - since) * 1000
+
+
+# ==========================================================
+# STAGES
+# ==========================================================
+
+def bench_parser(data, chunk, capacity):
+    # Same read pattern as CaptureWorker: copy into writable(), commit().
+    # Best of TRIALS, as the fastest run is the least disturbed one.
+    reset_peak_rss()
+    view = memoryview(data)
+    passes = max(1, PARSER_BYTES // len(data))
+
+    seconds = None
+    for _ in range(TRIALS):
+        parser = MjpegFrameParser(capacity, chunk)
+        frames = 0
+        started = time.perf_counter()
+        for _ in range(passes):
+            pos = 0
+            while pos < len(data):
+                target = parser.writable()[:chunk]
+                n = min(len(target), len(data) - pos)
+                target[:n] = view[pos:pos + n]
+                pos += n
+                frames += len(parser.commit(n))
+        trial = time.perf_counter() - started
+        seconds = trial if seconds is None else min(seconds, trial)
+
+    return {
+        "fps": round(frames / seconds, 1),
+        "mb_per_s": round(len(data) * passes / seconds / 1e6, 1),
+        "copied_per_frame": round(parser.bytes_copied / max(frames, 1)),
+        "dropped_bytes": parser.dropped_bytes,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def bench_decode(frames):
+    reset_peak_rss()
+    decode, scale, metrics, total = [], [], [], []
+    width, height = PREVIEW_SIZE
+
+    for frame in frames:
+        started = time.perf_counter()
+        image = QImage.fromData(frame)
+        decoded = time.perf_counter()
+        image = image.scaled(width, height, Qt.KeepAspectRatio, Qt.FastTransformation)
+        scaled = time.perf_counter()
+        frame_metrics(image)
+
+        decode.append((decoded - started) * 1000)
+        scale.append((scaled - decoded) * 1000)
+        metrics.append(ms(scaled))
+        total.append(ms(started))
+
+    return {
+        "fps": round(1000 * len(total) / sum(total), 1),
+        "decode_ms": percentiles(decode),
+        "scale_ms": percentiles(scale),
+        "metrics_ms": percentiles(metrics),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+class TimedReplaySource(ReplaySource):
+    # Notes when each frame leaves the source
+
+    def __init__(self, frames, fps):
+        super().__init__(None, fps=fps)
+        self.frames = frames
+        self.sent_at = {}
+        self.sent = 0
+
+    def _next_frame(self):
+        frame = super()._next_frame()
+        if frame is not None:
+            self.sent_at[hash(frame)] = time.perf_counter()
+            self.sent += 1
+        return frame
+
+
+class TimedWorker(CaptureWorker):
+    def __init__(self, source, width, height):
+        super().__init__(source, width, height)
+        self.latencies = []
+
+    def _decode(self, frame):
+        sent_at = self.source.sent_at.get(hash(frame))
+        super()._decode(frame)
+        if sent_at is not None:
+            self.latencies.append(ms(sent_at))
+
+
+def bench_pipeline(app, frames, fps):
+    reset_peak_rss()
+    source = TimedReplaySource(frames, fps)
+    worker = TimedWorker(source, *PREVIEW_SIZE)
+
+    # Pull frames like UploadScreen.show_frame(), keeping only a count
+    delivered = [0]
+
+    def show_frame():
+        if worker.take_frame() is not None:
+            delivered[0] += 1
+
+    worker.frame_ready.connect(show_frame)
+
+    loop = QEventLoop()
+    QTimer.singleShot(int(PIPELINE_SECONDS * 1000), loop.quit)
+    started = time.perf_counter()
+    worker.start()
+    loop.exec()
+    seconds = time.perf_counter() - started
+    worker.stop()
+    worker.frame_ready.disconnect()
+    worker.deleteLater()
+    app.processEvents()
+
+    return {
+        "source_fps": round(source.sent / seconds, 1),
+        "fps": round(len(worker.latencies) / seconds, 1),
+        "ui_fps": round(delivered[0] / seconds, 1),
+        "skipped": source.sent - len(worker.latencies),
+        "latency_ms": percentiles(worker.latencies),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+# ==========================================================
+# REPORT
+# ==========================================================
+
+def run_all(app, fixtures):
+    results = {}
+
+    for name, data in fixtures.items():
+        frames = split_frames(data)
+        size = sum(map(len, frames)) // max(len(frames), 1)
+        print(f"\n{name}: {len(frames)} frames, {size / 1024:.1f} KiB/frame")
+
+        for capacity in CAPACITIES:
+            for chunk in CHUNK_SIZES:
+                r = bench_parser(data, chunk, capacity)
+                results[f"{name}/parser/cap{capacity}/chunk{chunk}"] = r
+                print(
+                    f"  parser   cap {capacity:>9,} chunk {chunk:>7,}: "
+                    f"{r['fps']:>9.1f} fps {r['mb_per_s']:>7.1f} MB/s "
+                    f"copied {r['copied_per_frame']:>7,} B/frame "
+                    f"rss {r['peak_rss_mb']} MB"
+                )
+
+        r = bench_decode(frames)
+        results[f"{name}/decode"] = r
+        print(
+            f"  decode   {r['fps']:>7.1f} fps  decode {fmt(r['decode_ms'])}  "
+            f"scale {fmt(r['scale_ms'])}  metrics {fmt(r['metrics_ms'])}  "
+            f"rss {r['peak_rss_mb']} MB"
+        )
+
+        for fps in FRAME_RATES:
+            r = bench_pipeline(app, frames, fps)
+            results[f"{name}/pipeline/{fps or 'max'}fps"] = r
+            print(
+                f"  pipeline {fps or 'max':>3} fps in: {r['source_fps']:>7.1f} "
+                f"decoded {r['fps']:>6.1f} ui {r['ui_fps']:>6.1f} fps  "
+                f"latency {fmt(r['latency_ms'])}  rss {r['peak_rss_mb']} MB"
+            )
+
+    return results
+
+
+def fmt(p):
+    if p["p50"] is None:
+        return "-"
+    return f"p50 {p['p50']:.2f} p95 {p['p95']:.2f} p99 {p['p99']:.2f} ms"
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    regressions = []
+    for case, old in baseline.items():
+        new = results.get(case)
+        # Paced pipeline runs are capped by their frame rate, so only the
+        # unpaced ones say anything about speed
+        if new is None or "/pipeline/" in case and not case.endswith("maxfps"):
+            continue
+        if new["fps"] < old["fps"] * (1 - TOLERANCE):
+            regressions.append(f"{case}: {old['fps']} -> {new['fps']} fps")
+
+    for line in regressions:
+        print("REGRESSION", line)
+    return not regressions
+
+
+def run():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixture", action="append", default=[])
+    parser.add_argument("--json")
+    parser.add_argument("--baseline")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication([])
+    results = run_all(app, load_fixtures(args.fixture))
+    print(f"\npeak rss of the run: "
+          f"{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline and not compare(results, args.baseline):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,272 @@
+# End-to-end latency of one patient through the kiosk, headless:
+#
+#   python bench/e2e.py [--runs 10] [--json OUT] [mock server options]
+#
+# Starts bench/mock_server.py (any option this script does not know is
+# passed on to it, e.g. --analyze-ms 1500 --error-rate 0.1), points the
+# kiosk at it, feeds the upload screen from a replay camera, and drives
+# the real screens: info form, registration, camera start, capture,
+# analysis and result. With --server URL an already running server is
+# used instead, such as the lab server.
+#
+# Stages, per run:
+#   register  Next on the info form until the registration reply arrives
+#   camera    registration reply until the preview is ready to analyze
+#   capture   Analyze until the still is in hand
+#   analyze   still in hand until the analysis reply arrives; split into
+#             preprocess and request (the HTTP round trip) as reported
+#             by ApiClient.last_upload
+#   result    analysis reply until the result screen is painted
+#   total     Next on the info form until the result screen is painted
+#
+# The first run pays for connection setup and first use of each screen,
+# so it is reported apart from the rest.
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, HERE)
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+STAGES = (
+    "register", "camera", "capture", "analyze", "preprocess", "request",
+    "result", "total"
+)
+STAGE_TIMEOUT_MS = 30000
+
+
+def start_mock_server(server_args):
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "mock_server.py"),
+         "--port", "0", *server_args],
+        stdout=subprocess.PIPE,
+        text=True
+    )
+    # "listening on http://127.0.0.1:PORT"
+    return process, process.stdout.readline().split()[-1]
+
+
+def write_fixtures(preview, still):
+    from capture import FIXTURES, synthetic_mjpeg
+
+    with open(preview, "wb") as f:
+        f.write(synthetic_mjpeg(*FIXTURES["preview-320x240-q50"]))
+
+    width, height, quality, _ = FIXTURES["still-2028x1520-q93"]
+    with open(still, "wb") as f:
+        f.write(synthetic_mjpeg(width, height, quality, 1))
+
+
+class Recorder:
+    # Timestamps calls to screen methods, and lets the driver wait for them
+    # without polling
+
+    def __init__(self):
+        from PySide6.QtCore import QEventLoop, QTimer
+
+        self.marks = {}
+        self.loop = QEventLoop()
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.loop.quit)
+        self.waiting = ()
+
+    def hook(self, obj, name):
+        original = getattr(obj, name)
+
+        def wrapper(*args, **kwargs):
+            self.mark(name)
+            return original(*args, **kwargs)
+
+        setattr(obj, name, wrapper)
+
+    def mark(self, label):
+        self.marks[label] = time.perf_counter()
+        if label in self.waiting:
+            self.loop.quit()
+
+    def wait(self, *labels):
+        if not any(label in self.marks for label in labels):
+            self.waiting = labels
+            self.timer.start(STAGE_TIMEOUT_MS)
+            self.loop.exec()
+            self.timer.stop()
+            self.waiting = ()
+
+        for label in labels:
+            if label in self.marks:
+                return label
+
+        raise TimeoutError(f"Timed out waiting for {' or '.join(labels)}")
+
+
+def run_patient(app, window, recorder, api, n):
+    recorder.marks.clear()
+    ms = lambda a, b: (recorder.marks[b] - recorder.marks[a]) * 1000
+
+    window.home.go_next()
+    window.user_type.go_new()
+    app.processEvents()
+
+    info = window.info
+    info.first_name.setText("Bench")
+    info.last_name.setText(f"Patient{chr(ord('a') + n % 26)}")
+    info.age.setText("30")
+    info.sex.setCurrentIndex(1)
+
+    recorder.mark("next")
+    info.next_btn.click()
+    outcome = recorder.wait("user_created", "user_failed")
+    if outcome == "user_failed":
+        return {"outcome": "registration failed"}
+
+    recorder.wait("camera_ready")
+
+    recorder.mark("analyze_clicked")
+    window.upload.analyze_btn.click()
+    recorder.wait("analyze_frame")
+
+    outcome = recorder.wait(
+        "analysis_finished", "defer_analysis", "analysis_failed"
+    )
+    if outcome == "defer_analysis":
+        return {"outcome": "analysis queued in the outbox"}
+    if outcome == "analysis_failed":
+        return {"outcome": "analysis failed"}
+
+    app.processEvents()
+    window.result.repaint()
+    recorder.mark("painted")
+
+    upload = api.client.last_upload or {}
+    stages = {
+        "register": ms("next", "user_created"),
+        "camera": ms("user_created", "camera_ready"),
+        "capture": ms("analyze_clicked", "analyze_frame"),
+        "analyze": ms("analyze_frame", "analysis_finished"),
+        "preprocess": upload.get("preprocess_ms"),
+        "request": upload.get("request_ms"),
+        "result": ms("analysis_finished", "painted"),
+        "total": ms("next", "painted"),
+    }
+
+    return {"outcome": "ok", "upload_bytes": upload.get("bytes_out"), **stages}
+
+
+def summarize(runs):
+    ok = [run for run in runs if run["outcome"] == "ok"]
+    first, rest = (ok[0], ok[1:]) if ok else (None, [])
+    summary = {}
+
+    print(f"\n{len(ok)}/{len(runs)} runs completed")
+    for run in runs:
+        if run["outcome"] != "ok":
+            print("  ", run["outcome"])
+
+    print(f"\n{'stage':<11}{'first':>9}{'p50':>9}{'p95':>9}{'max':>9}   ms")
+    for stage in STAGES:
+        values = sorted(run[stage] for run in rest if run[stage] is not None)
+        row = {"first": first[stage] if first else None}
+        if values:
+            last = len(values) - 1
+            row.update(
+                p50=values[int(last * 0.5 + 0.5)],
+                p95=values[int(last * 0.95 + 0.5)],
+                max=values[-1]
+            )
+        summary[stage] = row
+        print(f"{stage:<11}" + "".join(
+            f"{row[k]:>9.1f}" if row.get(k) is not None else f"{'-':>9}"
+            for k in ("first", "p50", "p95", "max")
+        ))
+
+    return summary
+
+
+def run():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--server", help="use this server instead of the mock")
+    parser.add_argument("--capture", choices=("still", "stream"), default="still")
+    parser.add_argument("--json")
+    args, server_args = parser.parse_known_args()
+
+    server = None
+    url = args.server
+    if url is None:
+        server, url = start_mock_server(server_args)
+    print(f"server: {url}")
+
+    # Read by the services at import time, so set before anything from
+    # services is imported
+    work = tempfile.mkdtemp(prefix="peesense-e2e-")
+    preview = os.path.join(work, "preview.mjpeg")
+    still = os.path.join(work, "still.jpg")
+    os.environ["PEESENSE_API_URL"] = url
+    os.environ["PEESENSE_DATA_DIR"] = work
+    os.environ["PEESENSE_CAMERA"] = f"replay:{preview}"
+    os.environ["PEESENSE_REPLAY_STILL"] = still
+
+    write_fixtures(preview, still)
+
+    from PySide6.QtWidgets import QApplication, QDialog, QMessageBox
+
+    app = QApplication.instance() or QApplication([])
+
+    import main
+    import screens.info
+    import screens.upload
+    from services import api
+
+    screens.upload.CAPTURE_MODE = args.capture
+    # Nobody is there to click the confirmation or error dialogs
+    screens.info.ConfirmDialog.exec = lambda self: QDialog.Accepted
+    for name in ("critical", "warning", "information"):
+        setattr(QMessageBox, name, staticmethod(lambda *a, **k: None))
+
+    main.apply_theme(app)
+    window = main.MainWindow()
+    window.show()
+    main.start_services()
+
+    recorder = Recorder()
+    recorder.hook(window.info, "user_created")
+    recorder.hook(window.info, "user_failed")
+    recorder.hook(window.upload, "camera_ready")
+    recorder.hook(window.upload, "analyze_frame")
+    recorder.hook(window.upload, "analysis_finished")
+    recorder.hook(window.upload, "analysis_failed")
+    recorder.hook(window.upload, "defer_analysis")
+
+    runs = []
+    try:
+        for n in range(args.runs):
+            try:
+                runs.append(run_patient(app, window, recorder, api, n))
+            except TimeoutError as e:
+                runs.append({"outcome": str(e)})
+
+            window.result.go_home()
+            app.processEvents()
+    finally:
+        window.upload.stop_camera_stream()
+        if server is not None:
+            server.kill()
+
+    summary = summarize(runs)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"runs": runs, "summary": summary}, f, indent=2)
+
+
+if __name__ == "__main__":
+    run()
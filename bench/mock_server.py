@@ -0,0 +1,274 @@
+# Local stand-in for the analysis server, for load tests and benchmarks:
+#
+#   python bench/mock_server.py [--port 5000] [--analyze-ms 800]
+#                               [--error-rate 0.05] [--users 5000] ...
+#   PEESENSE_API_URL=http://127.0.0.1:5000 python main.py
+#
+# Implements the parts of the API the kiosk uses: POST /info, POST
+# /analyze, GET /users (ETag, and limit/offset/q paging with --paged) and
+# HEAD / for connection warm-up. Idempotency-Key is honoured like the
+# real server, so outbox retries can be exercised. --port 0 picks a free
+# port; the address is printed on the first line of output.
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIRST_NAMES = ("Ana", "Maria", "Jose", "Juan", "Mark", "Liza", "Paolo", "Grace")
+LAST_NAMES = ("Cruz", "Reyes", "Santos", "Garcia", "Lim", "Tan", "Bautista")
+
+FORM_FIELD = re.compile(rb'name="(\w+)"\r\n\r\n([^\r]*)\r\n')
+
+
+class MockState:
+    def __init__(self, options):
+        self.options = options
+        self.lock = threading.Lock()
+        self.random = random.Random(options.seed)
+
+        self.users = [fake_user(i) for i in range(1, options.users + 1)]
+        self.version = 0
+        self.results = 0
+
+        # Idempotency-Key -> (status, body) of the first response
+        self.replies = {}
+        self.requests = 0
+
+    def etag(self):
+        return f'"{len(self.users)}-{self.version}"'
+
+    def delay(self, ms):
+        if ms <= 0:
+            return
+        jitter = self.options.jitter
+        with self.lock:
+            factor = self.random.uniform(1 - jitter, 1 + jitter)
+        time.sleep(ms * factor / 1000)
+
+    def fails(self):
+        with self.lock:
+            return self.random.random() < self.options.error_rate
+
+
+def fake_user(i):
+    return {
+        "id": i,
+        "firstname": FIRST_NAMES[i % len(FIRST_NAMES)],
+        "middlename": "",
+        "lastname": f"{LAST_NAMES[i % len(LAST_NAMES)]}{i}",
+        "age": 18 + i % 60,
+        "gender": "Female" if i % 2 else "Male",
+    }
+
+
+def matches(user, terms):
+    tokens = [
+        token.lower()
+        for field in ("firstname", "middlename", "lastname")
+        for token in (user.get(field) or "").split()
+    ]
+    return all(any(t.startswith(term) for t in tokens) for term in terms)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out as separate writes; without this, Nagle
+        # and the client's delayed ACK add ~40 ms to keep-alive requests
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, fmt, *args):
+        if self.state.options.verbose:
+            super().log_message(fmt, *args)
+
+    def send_json(self, status, body, headers=()):
+        data = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        if body is not None:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length)
+
+    # ==========================================================
+    # ROUTES
+    # ==========================================================
+
+    def do_HEAD(self):
+        self.send_json(200, None)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/users":
+            self.send_json(404, {"error": "Not found"})
+            return
+
+        state = self.state
+        state.delay(state.options.users_ms)
+        if state.fails():
+            self.send_json(state.options.error_status, {"error": "Injected failure"})
+            return
+
+        with state.lock:
+            state.requests += 1
+            etag = state.etag()
+            users = list(state.users)
+
+        if self.headers.get("If-None-Match") == etag:
+            self.send_json(304, None, [("ETag", etag)])
+            return
+
+        query = parse_qs(url.query)
+        if state.options.paged and "limit" in query:
+            terms = (query.get("q") or [""])[0].lower().split()
+            if terms:
+                users = [user for user in users if matches(user, terms)]
+
+            offset = int(query.get("offset", ["0"])[0])
+            limit = int(query["limit"][0])
+            body = {"users": users[offset:offset + limit], "total": len(users)}
+        else:
+            body = users
+
+        self.send_json(200, body, [("ETag", etag)])
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        body = self.read_body()
+        state = self.state
+
+        route = {"/info": self.create_user, "/analyze": self.analyze}.get(path)
+        if route is None:
+            self.send_json(404, {"error": "Not found"})
+            return
+
+        key = self.headers.get("Idempotency-Key")
+        with state.lock:
+            state.requests += 1
+            reply = state.replies.get(key) if key else None
+
+        if reply is None:
+            reply = route(body)
+
+            # Failures are not remembered, so a retry can succeed
+            if key and reply[0] < 400:
+                with state.lock:
+                    reply = state.replies.setdefault(key, reply)
+
+        self.send_json(*reply)
+
+    def create_user(self, body):
+        state = self.state
+        state.delay(state.options.info_ms)
+        if state.fails():
+            return state.options.error_status, {"error": "Injected failure"}
+
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return 400, {"error": "Invalid JSON"}
+
+        with state.lock:
+            user = {**payload, "id": len(state.users) + 1}
+            state.users.append(user)
+            state.version += 1
+
+        return 201, user
+
+    def analyze(self, body):
+        state = self.state
+        options = state.options
+
+        if len(body) > options.max_upload:
+            return 413, {"success": False, "error": "Image too large"}
+
+        state.delay(options.analyze_ms)
+        if state.fails():
+            return options.error_status, {"success": False, "error": "Injected failure"}
+
+        fields = dict(FORM_FIELD.findall(body[:4096]))
+        part = body.find(b"filename=")
+        if part == -1:
+            return 400, {"success": False, "error": "No image uploaded"}
+        image = body[body.find(b"\r\n\r\n", part) + 4:body.rfind(b"\r\n--")]
+
+        with state.lock:
+            state.results += 1
+            result_id = state.results
+
+        # Deterministic readings per image, so repeated runs agree
+        digest = hashlib.sha1(image).digest()
+
+        result = {
+            "success": True,
+            "user_id": int(fields.get(b"user_id", b"0") or 0),
+            "result_id": result_id,
+            "result_url": f"http://{self.headers.get('Host')}/results/{result_id}",
+            "rbc": digest[0] % 10,
+            "wbc": digest[1] % 15,
+            "uti": digest[2] % 4 == 0,
+        }
+        if options.result_bytes:
+            result["padding"] = "x" * options.result_bytes
+
+        return 201, result
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--analyze-ms", type=float, default=800)
+    parser.add_argument("--info-ms", type=float, default=50)
+    parser.add_argument("--users-ms", type=float, default=50)
+    parser.add_argument("--jitter", type=float, default=0.2,
+                        help="latencies vary by up to this fraction")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--paged", action="store_true",
+                        help="honour limit/offset/q on GET /users")
+    parser.add_argument("--result-bytes", type=int, default=0,
+                        help="pad /analyze responses to about this size")
+    parser.add_argument("--max-upload", type=int, default=16_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true")
+    return parser.parse_args(argv)
+
+
+def make_server(options):
+    handler = type("MockHandler", (Handler,), {"state": MockState(options)})
+    server = ThreadingHTTPServer((options.host, options.port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def run():
+    server = make_server(parse_args())
+    host, port = server.server_address[:2]
+    print(f"listening on http://{host}:{port}", flush=True)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    run()
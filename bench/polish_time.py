@@ -0,0 +1,178 @@
+# Measures style-sheet polish cost.
+#
+#   QT_QPA_PLATFORM=offscreen python bench/polish_time.py [--root PATH]
+#
+# "screens" builds every screen and shows each once, which is when Qt
+# parses style sheets and polishes the widget tree. Run it with --root
+# pointing at a checkout of an older revision to compare against the
+# per-widget setStyleSheet() version of the UI.
+#
+# "toggle" flips the InfoScreen validation highlight on one field, once
+# by replacing the field's style sheet (how InfoScreen.highlight() and
+# reset() used to work) and once by flipping the "error" property.
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# The old highlight()/reset() style sheets, verbatim
+OLD_ERROR_STYLE = """
+    border: 2px solid #d32f2f;
+    border-radius: 6px;
+    padding: 6px;
+    font-size: 13px;
+    background: white;
+    color: #1a2b49;
+"""
+OLD_DEFAULT_STYLE = """
+    QLineEdit, QComboBox {
+        border: 1px solid #cfd9e6;
+        border-radius: 6px;
+        padding: 6px;
+        font-size: 13px;
+        background: white;
+        color: #1a2b49;
+    }
+"""
+
+SCREENS = (
+    "home", "user_type", "info", "registered", "result", "admin_password"
+)
+
+
+def ms(since):
+    return (time.perf_counter() - since) * 1000
+
+
+def bench_screens(app, runs):
+    from PySide6.QtWidgets import QMainWindow, QStackedWidget
+
+    import main
+
+    if hasattr(main, "apply_theme"):
+        main.apply_theme(app)
+
+    totals = []
+    for _ in range(runs):
+        window = QMainWindow()
+        stack = QStackedWidget()
+        window.setCentralWidget(stack)
+        window.resize(800, 480)
+        window.show()
+        app.processEvents()
+
+        started = time.perf_counter()
+        for name in SCREENS:
+            module_name, class_name = main_screens(main)[name]
+            module = __import__(module_name, fromlist=[class_name])
+            screen = getattr(module, class_name)(window)
+            stack.addWidget(screen)
+            stack.setCurrentWidget(screen)
+            app.processEvents()
+        totals.append(ms(started))
+
+        window.close()
+        window.deleteLater()
+        app.processEvents()
+
+    return totals
+
+
+def main_screens(main):
+    # Older revisions import the screen classes directly into main
+    if hasattr(main, "SCREENS"):
+        return main.SCREENS
+
+    return {
+        name: (getattr(main, cls).__module__, cls)
+        for name, cls in (
+            ("home", "HomeScreen"),
+            ("user_type", "UserTypeScreen"),
+            ("info", "InfoScreen"),
+            ("registered", "RegisteredUserScreen"),
+            ("result", "ResultScreen"),
+            ("admin_password", "AdminPasswordScreen"),
+        )
+    }
+
+
+def bench_toggle(app, toggles):
+    from PySide6.QtWidgets import QLineEdit, QVBoxLayout, QWidget
+
+    from services.theme import STYLESHEET, set_role, set_state
+
+    app.setStyleSheet(STYLESHEET)
+
+    page = QWidget()
+    layout = QVBoxLayout(page)
+    old_field = QLineEdit()
+    new_field = set_role(QLineEdit(), "input", error=False)
+    layout.addWidget(old_field)
+    layout.addWidget(new_field)
+    old_field.setStyleSheet(OLD_DEFAULT_STYLE)
+    page.show()
+    app.processEvents()
+
+    started = time.perf_counter()
+    for i in range(toggles):
+        old_field.setStyleSheet(OLD_ERROR_STYLE if i % 2 == 0 else OLD_DEFAULT_STYLE)
+        app.processEvents()
+    old = ms(started) / toggles
+
+    started = time.perf_counter()
+    for i in range(toggles):
+        set_state(new_field, "error", i % 2 == 0)
+        app.processEvents()
+    new = ms(started) / toggles
+
+    page.close()
+    return old, new
+
+
+def run():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--root", default=os.path.join(os.path.dirname(__file__), ".."))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--toggles", type=int, default=200)
+    args = parser.parse_args()
+
+    root = os.path.abspath(args.root)
+    sys.path.insert(0, root)
+    os.chdir(root)
+
+    # Keep caches and queues of the benchmark away from the kiosk's own
+    os.environ.setdefault("PEESENSE_DATA_DIR", tempfile.mkdtemp())
+    os.environ.setdefault("PEESENSE_API_URL", "http://127.0.0.1:9")
+
+    from PySide6.QtCore import QThreadPool
+    from PySide6.QtWidgets import QApplication
+
+    app = QApplication.instance() or QApplication([])
+
+    totals = bench_screens(app, args.runs)
+    # Let the screens' background user fetches fail before Qt tears down
+    QThreadPool.globalInstance().waitForDone()
+    print(f"tree: {root}")
+    print(
+        f"screens: build + first polish of {len(SCREENS)} screens "
+        f"median {statistics.median(totals):.1f} ms "
+        f"(min {min(totals):.1f}, runs {args.runs})"
+    )
+
+    try:
+        old, new = bench_toggle(app, args.toggles)
+    except ImportError:
+        print("toggle: skipped, this tree has no services.theme")
+        return
+
+    print(
+        f"toggle: setStyleSheet {old:.3f} ms, property + polish {new:.3f} ms "
+        f"per change ({old / new:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,163 @@
+# Patient throughput from the kiosk's session traces (services/trace.py):
+#
+#   python bench/sessions.py [FILE ...] [--json OUT]
+#
+# With no FILE, reads sessions.jsonl and its rotations from the data
+# directory. Traces copied from several kiosks can be passed together;
+# they are reported per kiosk.
+#
+# For each kiosk:
+#   - sessions by outcome, and patients/hour: completed sessions over the
+#     time the kiosk was in use, plus the busiest clock hour
+#   - the time spent between consecutive steps (info_submitted ->
+#     user_created is the registration request, analysis_started ->
+#     result_received the capture and analysis, and so on)
+#   - idle time before each session. A patient who starts within
+#     QUEUE_IDLE seconds of the previous one was most likely waiting in
+#     line, so the share of such sessions shows when a queue builds up.
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+QUEUE_IDLE = 10
+
+
+def default_files():
+    from services.storage import DATA_DIR
+    from services.trace import ROTATE_KEEP, TRACE_FILE
+
+    path = os.path.join(DATA_DIR, TRACE_FILE)
+    # Oldest first
+    paths = [f"{path}.{n}" for n in range(ROTATE_KEEP, 0, -1)] + [path]
+    return [p for p in paths if os.path.exists(p)]
+
+
+def load(paths):
+    sessions = []
+    for path in paths:
+        with open(path) as f:
+            for n, line in enumerate(f, 1):
+                try:
+                    sessions.append(json.loads(line))
+                except ValueError:
+                    print(f"{path}:{n}: skipping malformed line")
+    return sessions
+
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def segments(session):
+    # (from step, to step) -> seconds
+    steps = session["steps"]
+    return [
+        ((a["step"], b["step"]), b["t"] - a["t"])
+        for a, b in zip(steps, steps[1:])
+    ]
+
+
+def summarize(sessions):
+    outcomes = Counter(s["outcome"] for s in sessions)
+    completed = [s for s in sessions if s["outcome"] == "completed"]
+
+    first = min(s["started"] for s in sessions)
+    last = max(s["started"] + s["duration"] for s in sessions)
+    hours = max((last - first) / 3600, 1 / 60)
+
+    by_hour = Counter(
+        time.strftime("%Y-%m-%d %H:00", time.localtime(s["started"]))
+        for s in completed
+    )
+    busiest = by_hour.most_common(1)[0] if by_hour else (None, 0)
+
+    durations = defaultdict(list)
+    for s in completed:
+        for segment, seconds in segments(s):
+            durations[segment].append(seconds)
+
+    idle = [s["idle_before"] for s in sessions if s["idle_before"] is not None]
+    queued = sum(1 for i in idle if i < QUEUE_IDLE)
+
+    return {
+        "sessions": len(sessions),
+        "outcomes": dict(outcomes),
+        "patients_per_hour": len(completed) / hours,
+        "busiest_hour": {"hour": busiest[0], "patients": busiest[1]},
+        "session_p50": percentile([s["duration"] for s in completed], 50),
+        "session_p95": percentile([s["duration"] for s in completed], 95),
+        "idle_p50": percentile(idle, 50),
+        "queued_share": queued / len(idle) if idle else None,
+        "steps": {
+            f"{a} -> {b}": {
+                "n": len(values),
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+            }
+            for (a, b), values in durations.items()
+        },
+    }
+
+
+def report(kiosk, summary):
+    fmt = lambda v: "-" if v is None else f"{v:.1f}"
+
+    print(f"\n{kiosk}: {summary['sessions']} sessions  " + "  ".join(
+        f"{outcome} {n}" for outcome, n in sorted(summary["outcomes"].items())
+    ))
+    print(f"  patients/hour {summary['patients_per_hour']:.1f}"
+          f"   busiest hour {summary['busiest_hour']['hour']}"
+          f" ({summary['busiest_hour']['patients']})")
+    print(f"  session p50 {fmt(summary['session_p50'])} s"
+          f"   p95 {fmt(summary['session_p95'])} s")
+
+    share = summary["queued_share"]
+    print(f"  idle before p50 {fmt(summary['idle_p50'])} s   started within "
+          f"{QUEUE_IDLE} s of the previous patient: "
+          f"{'-' if share is None else f'{share:.0%}'}")
+
+    print(f"\n  {'completed sessions, step':<44}{'n':>6}{'p50':>9}{'p95':>9}   s")
+    for segment, row in sorted(
+        summary["steps"].items(), key=lambda item: -(item[1]["p50"] or 0)
+    ):
+        print(f"  {segment:<44}{row['n']:>6}{fmt(row['p50']):>9}{fmt(row['p95']):>9}")
+
+
+def run():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--json")
+    args = parser.parse_args()
+
+    paths = args.files or default_files()
+    sessions = load(paths)
+    if not sessions:
+        print("No sessions in", ", ".join(paths) or "the data directory")
+        return
+
+    kiosks = defaultdict(list)
+    for session in sessions:
+        kiosks[session["kiosk"]].append(session)
+
+    summaries = {}
+    for kiosk, kiosk_sessions in sorted(kiosks.items()):
+        summaries[kiosk] = summarize(kiosk_sessions)
+        report(kiosk, summaries[kiosk])
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summaries, f, indent=2)
+
+
+if __name__ == "__main__":
+    run()
@@ -1,17 +1,75 @@
+import time
+
+# Measured from here so the report includes the cost of the imports below
+STARTED = time.perf_counter()
+
+import importlib
 import sys
 
 from PySide6.QtWidgets import QApplication, QMainWindow, QStackedWidget, QLineEdit
-from PySide6.QtCore import Qt
+from PySide6.QtCore import QEvent, Qt, QTimer
 
 import services.keyboard as keyboard
+from services import metrics
+from services.theme import apply_theme
+
+# Screen attribute -> (module, class). Each screen module is imported and
+# the screen built the first time it is navigated to, or while the kiosk
+# is idle after startup.
+SCREENS = {
+    "home": ("screens.home", "HomeScreen"),
+    "user_type": ("screens.user_type", "UserTypeScreen"),
+    "info": ("screens.info", "InfoScreen"),
+    "upload": ("screens.upload", "UploadScreen"),
+    "result": ("screens.result", "ResultScreen"),
+    "registered": ("screens.registered_user", "RegisteredUserScreen"),
+    "admin_password": ("screens.admin_password", "AdminPasswordScreen"),
+}
+
+# Build the remaining screens in the background once the home screen is
+# up, one per event-loop pass, in likely order of use
+PREBUILD = True
+PREBUILD_ORDER = (
+    "user_type", "info", "registered", "upload", "result", "admin_password"
+)
+PREBUILD_DELAY_MS = 1000
+
+
+def elapsed_ms(since):
+    return (time.perf_counter() - since) * 1000
+
+
+class ScreenStack(QStackedWidget):
+    # Times each screen change from setCurrentWidget() to the first paint
+    # of the new screen, its showEvent() work included
+
+    def __init__(self):
+        super().__init__()
+        self._switching = None
+
+    def setCurrentWidget(self, screen):
+        started = time.perf_counter()
+
+        if screen is not self.currentWidget():
+            if self._switching:
+                self._switching[0].removeEventFilter(self)
+            self._switching = (screen, started)
+            screen.installEventFilter(self)
+
+        super().setCurrentWidget(screen)
 
-from screens.home import HomeScreen
-from screens.info import InfoScreen
-from screens.upload import UploadScreen
-from screens.result import ResultScreen
-from screens.user_type import UserTypeScreen
-from screens.registered_user import RegisteredUserScreen
-from screens.admin_password import AdminPasswordScreen  # ← added
+    def eventFilter(self, obj, event):
+        if (event.type() == QEvent.Paint and self._switching
+                and obj is self._switching[0]):
+            obj.removeEventFilter(self)
+            metrics.histogram(
+                "screen_transition_seconds",
+                "Screen change until the new screen is first painted",
+                screen=type(obj).__name__
+            ).observe(time.perf_counter() - self._switching[1])
+            self._switching = None
+
+        return False
 
 
 class MainWindow(QMainWindow):
@@ -24,37 +82,97 @@ class MainWindow(QMainWindow):
         self.setWindowFlags(Qt.Window | Qt.FramelessWindowHint)
         self.showMaximized()
 
-        self.stack = QStackedWidget()
+        self.stack = ScreenStack()
         self.setCentralWidget(self.stack)
 
-        # Initialize screens
-        self.home = HomeScreen(self)
-        self.user_type = UserTypeScreen(self)
-        self.info = InfoScreen(self)
-        self.upload = UploadScreen(self)
-        self.result = ResultScreen(self)
-        self.registered = RegisteredUserScreen(self)
-        self.admin_password = AdminPasswordScreen(self)  # ← added
-
-        # Add to stack
-        self.stack.addWidget(self.home)
-        self.stack.addWidget(self.user_type)
-        self.stack.addWidget(self.info)
-        self.stack.addWidget(self.upload)
-        self.stack.addWidget(self.result)
-        self.stack.addWidget(self.registered)
-        self.stack.addWidget(self.admin_password)  # ← added
+        # (screen, import ms, build ms) in build order
+        self.build_times = []
+
+        # Admin diagnostics, built on first use
+        self.metrics_overlay = None
 
         self.stack.setCurrentWidget(self.home)
 
+    def __getattr__(self, name):
+        # Only reached for screens not built yet; build_screen stores the
+        # screen as a plain attribute, so later lookups never come here
+        if name in SCREENS:
+            return self.build_screen(name)
+
+        raise AttributeError(name)
+
+    def build_screen(self, name):
+        module_name, class_name = SCREENS[name]
+
+        started = time.perf_counter()
+        module = importlib.import_module(module_name)
+        imported = time.perf_counter()
+
+        screen = getattr(module, class_name)(self)
+        setattr(self, name, screen)
+        self.stack.addWidget(screen)
+
+        self.build_times.append((
+            name,
+            (imported - started) * 1000,
+            elapsed_ms(imported)
+        ))
+        return screen
+
+    def is_built(self, name):
+        return name in self.__dict__
+
+    def prebuild(self, names=PREBUILD_ORDER):
+        remaining = [name for name in names if not self.is_built(name)]
+
+        if remaining:
+            self.build_screen(remaining[0])
+            QTimer.singleShot(0, lambda: self.prebuild(remaining[1:]))
+        else:
+            self.report_startup()
+
+    def report_startup(self):
+        print("Startup timing (ms):")
+        for name, import_ms, build_ms in self.build_times:
+            print(f"  {name:<16} import {import_ms:7.1f}   build {build_ms:7.1f}")
+        print(f"  {'total':<16} {elapsed_ms(STARTED):.1f} since launch")
+
+    def show_metrics_overlay(self):
+        if self.metrics_overlay is None:
+            from screens.metrics_overlay import MetricsOverlay
+            self.metrics_overlay = MetricsOverlay(self)
+
+        self.metrics_overlay.show()
+        self.metrics_overlay.raise_()
+
     def mousePressEvent(self, event):
         super().mousePressEvent(event)
         self.setFocus()
         keyboard.hide_keyboard()
 
 
+def start_services():
+    # Pulls in requests and the sync machinery, after the first paint
+    from services import api
+    from services.loop_lag import start_stall_watchdog
+    from services.outbox import get_outbox
+    from services.user_cache import get_user_cache
+
+    start_stall_watchdog()
+    metrics.start_export()
+
+    api.client.warm_up()
+
+    # Resume sending anything queued before the last shutdown
+    get_outbox()
+
+    # The cached user list is usable immediately; sync it in the background
+    get_user_cache().refresh()
+
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    apply_theme(app)
 
     # Focus-based keyboard control
     def _on_focus_changed(old, new):
@@ -68,4 +186,11 @@ if __name__ == "__main__":
     window = MainWindow()
     window.show()
 
-    sys.exit(app.exec())
\ No newline at end of file
+    print(f"Home screen shown after {elapsed_ms(STARTED):.1f} ms")
+
+    QTimer.singleShot(0, start_services)
+
+    if PREBUILD:
+        QTimer.singleShot(PREBUILD_DELAY_MS, window.prebuild)
+
+    sys.exit(app.exec())
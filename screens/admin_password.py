@@ -5,6 +5,9 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QFont
 
+from services import trace
+from services.theme import set_role, set_screen_role
+
 EXIT_PASSWORD = "admin123"
 
 
@@ -12,31 +15,19 @@ class AdminPasswordScreen(QWidget):
     def __init__(self, main):
         super().__init__()
         self.main = main
-
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #eef2f7;
-                color: #1a2b49;
-            }
-        """)
+        set_screen_role(self, "backdrop")
 
         main_layout = QVBoxLayout(self)
         main_layout.setAlignment(Qt.AlignCenter)
 
-        card = QFrame()
+        card = set_role(QFrame(), "card")
         card.setFixedWidth(350)
-        card.setStyleSheet("""
-            QFrame {
-                background-color: white;
-                border-radius: 16px;
-                padding: 25px;
-            }
-        """)
 
         card_layout = QVBoxLayout(card)
+        card_layout.setContentsMargins(25, 25, 25, 25)
         card_layout.setSpacing(15)
 
-        title = QLabel("Admin Authorization")
+        title = set_role(QLabel("Admin Authorization"), "title", tone="dark")
         title.setFont(QFont("Segoe UI", 18, QFont.Bold))
         title.setAlignment(Qt.AlignCenter)
 
@@ -48,6 +39,10 @@ class AdminPasswordScreen(QWidget):
         confirm_btn.setFixedHeight(40)
         confirm_btn.clicked.connect(self.check_password)
 
+        diagnostics_btn = QPushButton("Diagnostics")
+        diagnostics_btn.setFixedHeight(35)
+        diagnostics_btn.clicked.connect(self.open_diagnostics)
+
         back_btn = QPushButton("Back")
         back_btn.setFixedHeight(35)
         back_btn.clicked.connect(self.go_back)
@@ -55,16 +50,28 @@ class AdminPasswordScreen(QWidget):
         card_layout.addWidget(title)
         card_layout.addWidget(self.input)
         card_layout.addWidget(confirm_btn)
+        card_layout.addWidget(diagnostics_btn)
         card_layout.addWidget(back_btn)
 
         main_layout.addWidget(card)
 
     def check_password(self):
         if self.input.text() == EXIT_PASSWORD:
+            trace.end("abandoned")
             QApplication.quit()
         else:
             self.input.clear()
 
+    def open_diagnostics(self):
+        # Same password; the overlay stays up over the kiosk screens until
+        # it is closed
+        if self.input.text() != EXIT_PASSWORD:
+            self.input.clear()
+            return
+
+        self.main.show_metrics_overlay()
+        self.go_back()
+
     def go_back(self):
         self.input.clear()
         self.main.stack.setCurrentWidget(self.main.home)
@@ -75,13 +82,6 @@ class HomeScreen(QWidget):
         super().__init__()
         self.main = main
 
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #eef2f7;
-                color: #1a2b49;
-            }
-        """)
-
         main_layout = QVBoxLayout(self)
         main_layout.setContentsMargins(0, 0, 0, 0)
         main_layout.setSpacing(0)
@@ -90,67 +90,34 @@ class HomeScreen(QWidget):
         top_bar = QHBoxLayout()
         top_bar.setContentsMargins(10, 10, 0, 0)
 
-        exit_btn = QPushButton("X")
-        exit_btn.setFixedSize(28, 28)
-        exit_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #d9534f;
-                color: white;
-                border-radius: 14px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background-color: #b52b27;
-            }
-        """)
+        exit_btn = set_role(QPushButton("X"), "close")
+        exit_btn.setFixedSize(26, 26)
         exit_btn.clicked.connect(self.open_admin_screen)
 
         top_bar.addWidget(exit_btn, alignment=Qt.AlignLeft)
         top_bar.addStretch()
 
-        center_container = QWidget()
+        center_container = set_role(QWidget(), "backdrop")
         center_layout = QVBoxLayout(center_container)
         center_layout.setAlignment(Qt.AlignCenter)
 
-        card = QFrame()
+        card = set_role(QFrame(), "card")
         card.setFixedWidth(380)
-        card.setStyleSheet("""
-            QFrame {
-                background-color: white;
-                border-radius: 16px;
-                padding: 25px;
-            }
-        """)
 
         card_layout = QVBoxLayout(card)
+        card_layout.setContentsMargins(25, 25, 25, 25)
         card_layout.setAlignment(Qt.AlignCenter)
         card_layout.setSpacing(15)
 
-        title = QLabel("PeeSense")
+        title = set_role(QLabel("PeeSense"), "title")
         title.setFont(QFont("Segoe UI", 24, QFont.Bold))
-        title.setStyleSheet("color: #2d63c8;")
         title.setAlignment(Qt.AlignCenter)
 
-        subtitle = QLabel("AI-Assisted Urinalysis System")
-        subtitle.setStyleSheet("""
-            color: #3b4a6b;
-            font-size: 14px;
-        """)
+        subtitle = set_role(QLabel("AI-Assisted Urinalysis System"), "subtitle")
         subtitle.setAlignment(Qt.AlignCenter)
 
-        start_btn = QPushButton("Get Started")
+        start_btn = set_role(QPushButton("Get Started"), "primary")
         start_btn.setFixedHeight(45)
-        start_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #2d63c8;
-                color: white;
-                font-size: 14px;
-                border-radius: 8px;
-            }
-            QPushButton:hover {
-                background-color: #1e4ea8;
-            }
-        """)
         start_btn.clicked.connect(self.go_next)
 
         card_layout.addWidget(title)
@@ -161,18 +128,12 @@ class HomeScreen(QWidget):
         center_layout.addWidget(card)
         center_layout.addStretch()
 
-        footer = QLabel(
+        footer = set_role(QLabel(
             "© 2026 PeeSense – AI-Assisted Urinalysis System\n"
             "For Academic & Research Use Only"
-        )
+        ), "footer")
         footer.setAlignment(Qt.AlignCenter)
         footer.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
-        footer.setStyleSheet("""
-            background-color: #2d63c8;
-            color: white;
-            padding: 10px;
-            font-size: 11px;
-        """)
 
         main_layout.addLayout(top_bar)
         main_layout.addWidget(center_container)
@@ -5,18 +5,15 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QFont
 
+from services import trace
+from services.theme import set_role, set_screen_role
+
 
 class HomeScreen(QWidget):
     def __init__(self, main):
         super().__init__()
         self.main = main
-
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #eef2f7;
-                color: #1a2b49;
-            }
-        """)
+        set_screen_role(self, "backdrop")
 
         main_layout = QVBoxLayout()
         main_layout.setContentsMargins(0, 0, 0, 0)
@@ -26,20 +23,8 @@ class HomeScreen(QWidget):
         top_bar = QHBoxLayout()
         top_bar.setContentsMargins(10, 10, 0, 0)
 
-        exit_btn = QPushButton("X")
+        exit_btn = set_role(QPushButton("X"), "close")
         exit_btn.setFixedSize(26, 26)
-        exit_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #d9534f;
-                color: white;
-                border-radius: 13px;
-                font-weight: bold;
-                padding: 0px;
-            }
-            QPushButton:hover {
-                background-color: #b52b27;
-            }
-        """)
         exit_btn.clicked.connect(self.open_admin_screen)
 
         top_bar.addWidget(exit_btn, alignment=Qt.AlignLeft)
@@ -48,49 +33,27 @@ class HomeScreen(QWidget):
         main_layout.addLayout(top_bar)
         # --- END TOP BAR ---
 
-        center_container = QWidget()
+        center_container = set_role(QWidget(), "backdrop")
         center_layout = QVBoxLayout(center_container)
         center_layout.setAlignment(Qt.AlignCenter)
 
-        card = QFrame()
+        card = set_role(QFrame(), "card")
         card.setFixedWidth(380)
-        card.setStyleSheet("""
-            QFrame {
-                background-color: white;
-                border-radius: 16px;
-                padding: 25px;
-            }
-        """)
 
         card_layout = QVBoxLayout()
+        card_layout.setContentsMargins(25, 25, 25, 25)
         card_layout.setAlignment(Qt.AlignCenter)
         card_layout.setSpacing(15)
 
-        title = QLabel("PeeSense")
+        title = set_role(QLabel("PeeSense"), "title")
         title.setFont(QFont("Segoe UI", 24, QFont.Bold))
-        title.setStyleSheet("color: #2d63c8;")
         title.setAlignment(Qt.AlignCenter)
 
-        subtitle = QLabel("AI-Assisted Urinalysis System")
-        subtitle.setStyleSheet("""
-            color: #3b4a6b;
-            font-size: 14px;
-        """)
+        subtitle = set_role(QLabel("AI-Assisted Urinalysis System"), "subtitle")
         subtitle.setAlignment(Qt.AlignCenter)
 
-        start_btn = QPushButton("Get Started")
+        start_btn = set_role(QPushButton("Get Started"), "primary")
         start_btn.setFixedHeight(45)
-        start_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #2d63c8;
-                color: white;
-                font-size: 14px;
-                border-radius: 8px;
-            }
-            QPushButton:hover {
-                background-color: #1e4ea8;
-            }
-        """)
         start_btn.clicked.connect(self.go_next)
 
         card_layout.addWidget(title)
@@ -103,18 +66,12 @@ class HomeScreen(QWidget):
         center_layout.addWidget(card, alignment=Qt.AlignCenter)
         center_layout.addStretch()
 
-        footer = QLabel(
+        footer = set_role(QLabel(
             "© 2026 PeeSense – AI-Assisted Urinalysis System\n"
             "For Academic & Research Use Only"
-        )
+        ), "footer")
         footer.setAlignment(Qt.AlignCenter)
         footer.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
-        footer.setStyleSheet("""
-            background-color: #2d63c8;
-            color: white;
-            padding: 10px;
-            font-size: 11px;
-        """)
 
         main_layout.addWidget(center_container)
         main_layout.addWidget(footer)
@@ -122,8 +79,9 @@ class HomeScreen(QWidget):
         self.setLayout(main_layout)
 
     def go_next(self):
+        trace.begin("start")
         self.main.stack.setCurrentWidget(self.main.user_type)
 
     def open_admin_screen(self):
         # Navigate directly to admin password page
-        self.main.stack.setCurrentWidget(self.main.admin_password)
\ No newline at end of file
+        self.main.stack.setCurrentWidget(self.main.admin_password)
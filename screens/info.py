@@ -5,7 +5,12 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtCore import Qt, QRegularExpression
 from PySide6.QtGui import QFont, QIntValidator, QRegularExpressionValidator
-from services.api import create_user
+from services import trace
+from services.api import create_user, is_unreachable
+from services.outbox import get_outbox, new_key
+from services.tasks import run_task
+from services.theme import set_role, set_screen_role, set_state
+from services.user_cache import get_user_cache
 
 
 class ConfirmDialog(QDialog):
@@ -15,24 +20,13 @@ class ConfirmDialog(QDialog):
         self.setFixedSize(340, 240)
         self.setWindowTitle("Confirm Details")
         self.setModal(True)
-
-        self.setStyleSheet("""
-            QDialog {
-                background-color: white;
-                border-radius: 12px;
-            }
-            QLabel {
-                color: #1a2b49;
-                font-size: 12px;
-            }
-        """)
+        set_role(self, "dialog")
 
         layout = QVBoxLayout(self)
         layout.setContentsMargins(20, 20, 20, 20)
         layout.setSpacing(10)
 
-        title = QLabel("Please confirm the entered details:")
-        title.setStyleSheet("font-weight:600; font-size:13px;")
+        title = set_role(QLabel("Please confirm the entered details:"), "heading")
 
         info = QLabel(
             f"Name: {full_name}\n"
@@ -44,28 +38,12 @@ class ConfirmDialog(QDialog):
 
         button_layout = QHBoxLayout()
 
-        no_btn = QPushButton("No")
+        no_btn = set_role(QPushButton("No"), "secondary")
         no_btn.setFixedHeight(35)
-        no_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #9aa5b1;
-                color: white;
-                border-radius: 6px;
-                font-size: 12px;
-            }
-        """)
         no_btn.clicked.connect(self.reject)
 
-        yes_btn = QPushButton("Yes")
+        yes_btn = set_role(QPushButton("Yes"), "primary")
         yes_btn.setFixedHeight(35)
-        yes_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #2d63c8;
-                color: white;
-                border-radius: 6px;
-                font-size: 12px;
-            }
-        """)
         yes_btn.clicked.connect(self.accept)
 
         button_layout.addWidget(no_btn)
@@ -81,37 +59,25 @@ class InfoScreen(QWidget):
     def __init__(self, main):
         super().__init__()
         self.main = main
+        set_screen_role(self, "backdrop")
+        self.create_task = None
         self.name_validator = QRegularExpressionValidator(
             QRegularExpression("[A-Za-z]*")
         )
 
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #eef2f7;
-                color: #1a2b49;
-            }
-        """)
-
         main_layout = QVBoxLayout(self)
         main_layout.setContentsMargins(20, 10, 20, 0)
 
         # ---------------- CARD ----------------
-        card = QFrame()
+        card = set_role(QFrame(), "card")
         card.setMaximumWidth(420)
-        card.setStyleSheet("""
-            QFrame {
-                background-color: white;
-                border-radius: 16px;
-            }
-        """)
 
         card_layout = QVBoxLayout(card)
         card_layout.setContentsMargins(25, 25, 25, 25)
         card_layout.setSpacing(12)
 
-        title = QLabel("Basic Information")
+        title = set_role(QLabel("Basic Information"), "title")
         title.setFont(QFont("Segoe UI", 20, QFont.Bold))
-        title.setStyleSheet("color: #2d63c8;")
         title.setAlignment(Qt.AlignCenter)
 
         # ---------------- INPUTS ----------------
@@ -139,71 +105,28 @@ class InfoScreen(QWidget):
         self.sex.addItems(["Select Sex", "Male", "Female"])
         self.sex.setFixedHeight(40)
 
-        input_style = """
-            QLineEdit, QComboBox {
-                border: 1px solid #cfd9e6;
-                border-radius: 6px;
-                padding: 6px;
-                font-size: 13px;
-                background: white;
-                color: #1a2b49;
-            }
-            QComboBox QAbstractItemView {
-                background: white;
-                color: black;
-                selection-background-color: #2d63c8;
-                selection-color: white;
-            }
-        """
-
-        for widget in [
-            self.first_name,
-            self.middle_name,
-            self.last_name,
-            self.age,
-            self.sex
-        ]:
-            widget.setStyleSheet(input_style)
+        for widget in self.fields():
+            set_role(widget, "input", error=False)
 
         # ---------------- ERROR LABEL ----------------
-        self.error_label = QLabel("")
+        self.error_label = set_role(QLabel(""), "error")
         self.error_label.setAlignment(Qt.AlignCenter)
-        self.error_label.setStyleSheet("""
-            color: #d32f2f;
-            font-size: 12px;
-        """)
         self.error_label.hide()
 
         # ---------------- BUTTONS ----------------
         button_layout = QHBoxLayout()
         button_layout.setSpacing(10)
 
-        back_btn = QPushButton("Back")
+        back_btn = set_role(QPushButton("Back"), "secondary")
         back_btn.setFixedHeight(40)
-        back_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #9aa5b1;
-                color: white;
-                font-size: 13px;
-                border-radius: 8px;
-            }
-        """)
         back_btn.clicked.connect(self.go_back)
 
-        next_btn = QPushButton("Next")
-        next_btn.setFixedHeight(40)
-        next_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #2d63c8;
-                color: white;
-                font-size: 14px;
-                border-radius: 8px;
-            }
-        """)
-        next_btn.clicked.connect(self.go_next)
+        self.next_btn = set_role(QPushButton("Next"), "primary")
+        self.next_btn.setFixedHeight(40)
+        self.next_btn.clicked.connect(self.go_next)
 
         button_layout.addWidget(back_btn)
-        button_layout.addWidget(next_btn)
+        button_layout.addWidget(self.next_btn)
 
         card_layout.addWidget(title)
         card_layout.addWidget(self.first_name)
@@ -219,21 +142,25 @@ class InfoScreen(QWidget):
         center_layout.addWidget(card, alignment=Qt.AlignCenter)
         center_layout.addStretch()
 
-        footer = QLabel(
+        footer = set_role(QLabel(
             "© 2026 PeeSense – AI-Assisted Urinalysis System\n"
             "For Academic & Research Use Only"
-        )
+        ), "footer")
         footer.setAlignment(Qt.AlignCenter)
         footer.setFixedHeight(55)
-        footer.setStyleSheet("""
-            background-color: #2d63c8;
-            color: white;
-            font-size: 11px;
-        """)
 
         main_layout.addLayout(center_layout)
         main_layout.addWidget(footer)
 
+    def fields(self):
+        return [
+            self.first_name,
+            self.middle_name,
+            self.last_name,
+            self.age,
+            self.sex
+        ]
+
     # ---------------- VALIDATION ----------------
     def validate_fields(self):
         self.error_label.hide()
@@ -276,14 +203,7 @@ class InfoScreen(QWidget):
         return True
 
     def highlight(self, widget):
-        widget.setStyleSheet("""
-            border: 2px solid #d32f2f;
-            border-radius: 6px;
-            padding: 6px;
-            font-size: 13px;
-            background: white;
-            color: #1a2b49;
-        """)
+        set_state(widget, "error", True)
 
     def show_error(self, message):
         self.error_label.setText(message)
@@ -291,8 +211,19 @@ class InfoScreen(QWidget):
 
     # ---------------- NAVIGATION ----------------
     def go_back(self):
+        self.cancel_create()
         self.main.stack.setCurrentWidget(self.main.user_type)
 
+    def cancel_create(self):
+        # The patient left; a registration still in flight must not move
+        # the kiosk on to the upload screen
+        if self.create_task:
+            self.create_task.cancel()
+        self.create_task = None
+
+        self.next_btn.setEnabled(True)
+        self.next_btn.setText("Next")
+
     def go_next(self):
         if not self.validate_fields():
             return
@@ -313,35 +244,90 @@ class InfoScreen(QWidget):
 
         dialog = ConfirmDialog(full_name, age, sex)
 
-        if dialog.exec() == QDialog.Accepted:
-            try:
-                result = create_user(
-                    firstname,
-                    middlename,
-                    lastname,
-                    age,
-                    sex
-                )
-
-                user_id = result.get("id")
-
-                self.main.upload.set_user_data(
-                    full_name,
-                    age,
-                    sex,
-                    user_id
-                )
-
-                self.main.stack.setCurrentWidget(self.main.upload)
-
-            except Exception as e:
-                QMessageBox.critical(
-                    self,
-                    "API Error",
-                    f"Failed to save user:\n{str(e)}"
-                )
+        if dialog.exec() != QDialog.Accepted:
+            return
+
+        trace.step("info_submitted")
+
+        self.next_btn.setEnabled(False)
+        self.next_btn.setText("Saving...")
+
+        payload = {
+            "firstname": firstname,
+            "middlename": middlename,
+            "lastname": lastname,
+            "age": age,
+            "gender": sex
+        }
+        key = new_key()
+
+        task = self.create_task = run_task(
+            create_user,
+            idempotency_key=key,
+            on_result=lambda result: self.user_created(
+                task, result, payload, full_name
+            ),
+            on_error=lambda message: self.user_failed(
+                task, message, key, payload, full_name
+            ),
+            **payload
+        )
+
+    def user_created(self, task, result, payload, full_name):
+        # Replies to a registration that was abandoned are dropped
+        if task is not self.create_task:
+            return
+        self.create_task = None
+
+        self.next_btn.setEnabled(True)
+        self.next_btn.setText("Next")
+
+        user_id = result.get("id")
+        trace.step("user_created")
+        get_user_cache().add_local({"id": user_id, **payload})
+
+        self.main.upload.set_user_data(
+            full_name,
+            payload["age"],
+            payload["gender"],
+            user_id
+        )
+
+        self.main.stack.setCurrentWidget(self.main.upload)
+
+    def user_failed(self, task, message, key, payload, full_name):
+        if task is not self.create_task:
+            return
+        self.create_task = None
+
+        self.next_btn.setEnabled(True)
+        self.next_btn.setText("Next")
+
+        if is_unreachable(task.error):
+            # Register offline; the sample is sent after the registration
+            get_outbox().enqueue("create_user", key, payload)
+            trace.step("user_queued")
+
+            self.main.upload.set_user_data(
+                full_name,
+                payload["age"],
+                payload["gender"],
+                None,
+                user_key=key
+            )
+
+            self.main.stack.setCurrentWidget(self.main.upload)
+            return
+
+        QMessageBox.critical(
+            self,
+            "API Error",
+            f"Failed to save user:\n{message}"
+        )
 
     def reset(self):
+        self.cancel_create()
+
         self.first_name.clear()
         self.middle_name.clear()
         self.last_name.clear()
@@ -351,22 +337,5 @@ class InfoScreen(QWidget):
         self.error_label.hide()
         self.error_label.setText("")
 
-        default_style = """
-            QLineEdit, QComboBox {
-                border: 1px solid #cfd9e6;
-                border-radius: 6px;
-                padding: 6px;
-                font-size: 13px;
-                background: white;
-                color: #1a2b49;
-            }
-        """
-
-        for widget in [
-            self.first_name,
-            self.middle_name,
-            self.last_name,
-            self.age,
-            self.sex
-        ]:
-            widget.setStyleSheet(default_style)
+        for widget in self.fields():
+            set_state(widget, "error", False)
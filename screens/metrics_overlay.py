@@ -0,0 +1,167 @@
+import os
+import time
+
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtGui import QFont
+from PySide6.QtWidgets import QFrame, QHBoxLayout, QLabel, QPushButton, QVBoxLayout
+
+from services import metrics
+from services.loop_lag import get_stall_watchdog
+from services.theme import set_role
+
+REFRESH_MS = 1000
+MARGIN = 12
+
+
+def total(name):
+    return sum(m.value for m in metrics.collect(name))
+
+
+def dropped(stage):
+    metric = metrics.find("camera_frames_dropped_total", stage=stage)
+    return 0 if metric is None else metric.value
+
+
+def ms(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:.1f}"
+
+
+def spread(histogram):
+    if histogram is None:
+        return "-"
+    return (
+        f"p50 {ms(histogram.percentile(50))}  "
+        f"p95 {ms(histogram.percentile(95))} ms"
+    )
+
+
+class MetricsOverlay(QFrame):
+    # Live view of services.metrics, floated over whichever screen is
+    # showing. Opened from the admin screen; only refreshes while visible.
+
+    def __init__(self, main):
+        super().__init__(main)
+        self.main = main
+        set_role(self, "overlay")
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(12, 8, 12, 12)
+        layout.setSpacing(4)
+
+        header = QHBoxLayout()
+        title = QLabel("Diagnostics")
+        close_btn = set_role(QPushButton("X"), "close")
+        close_btn.setFixedSize(22, 22)
+        close_btn.clicked.connect(self.hide)
+        header.addWidget(title)
+        header.addStretch()
+        header.addWidget(close_btn)
+
+        self.body = QLabel()
+        self.body.setFont(QFont("monospace", 9))
+        self.body.setTextInteractionFlags(Qt.NoTextInteraction)
+
+        layout.addLayout(header)
+        layout.addWidget(self.body)
+
+        # For per-second rates
+        self._last = None
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(REFRESH_MS)
+        self.timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self.timer.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.timer.stop()
+        self._last = None
+
+    def refresh(self):
+        now = time.monotonic()
+        decoded = total("camera_frames_decoded_total")
+
+        fps = "-"
+        if self._last is not None:
+            then, before = self._last
+            fps = f"{(decoded - before) / (now - then):.1f}"
+        self._last = (now, decoded)
+
+        lines = [
+            f"CAMERA  fps {fps}   decoded {decoded}   dropped "
+            f"read {dropped('read')} / ui {dropped('ui')}",
+            f"        parse  {spread(metrics.find('camera_parse_seconds'))}",
+            f"        decode {spread(metrics.find('camera_decode_seconds'))}",
+            "",
+            "HTTP",
+        ]
+
+        errors = {}
+        for m in metrics.collect("http_errors_total"):
+            key = (m.labels["method"], m.labels["path"])
+            errors[key] = errors.get(key, 0) + m.value
+
+        requests = sorted(
+            metrics.collect("http_request_seconds"),
+            key=lambda m: m.labels["path"]
+        )
+        for m in requests:
+            key = (m.labels["method"], m.labels["path"])
+            lines.append(
+                f"  {key[0]:<5}{key[1]:<10} n {m.count:<5} {spread(m)}"
+                f"   errors {errors.get(key, 0)}"
+            )
+        if not requests:
+            lines.append("  no requests yet")
+
+        upload = metrics.find("upload_bytes")
+        if upload is not None and upload.count:
+            saved = metrics.find("upload_bytes_saved_total").value
+            lines.append(
+                f"  uploads n {upload.count}   p50 "
+                f"{upload.percentile(50) / 1024:.0f} KiB   saved "
+                f"{saved / 1024 / 1024:.1f} MiB"
+            )
+
+        lines += ["", "SCREENS"]
+        for m in sorted(metrics.collect("screen_transition_seconds"),
+                        key=lambda m: m.labels["screen"]):
+            lines.append(
+                f"  {m.labels['screen']:<21} n {m.count:<5} {spread(m)}"
+            )
+
+        lag = metrics.find("event_loop_lag_seconds")
+        if lag is not None:
+            lines += [
+                "",
+                f"EVENT LOOP LAG  p50 {ms(lag.percentile(50))}  "
+                f"p99 {ms(lag.percentile(99))}  max {ms(lag.max())} ms",
+            ]
+
+        stalls = metrics.find("event_loop_stall_seconds")
+        watchdog = get_stall_watchdog()
+        if stalls is not None and watchdog is not None and watchdog.stalls:
+            last = watchdog.stalls[-1]
+            lines.append(
+                f"STALLS  n {stalls.count}   max {ms(stalls.max())}   "
+                f"last {ms(last.duration)} ms"
+            )
+            if last.samples:
+                filename, line, function = last.top()[0][-1]
+                lines.append(
+                    f"        in {function} "
+                    f"({os.path.basename(filename)}:{line})"
+                )
+
+        if metrics.EXPORT_PATH:
+            lines.append(f"EXPORT  {metrics.EXPORT_PATH}")
+
+        self.body.setText("\n".join(lines))
+        self.adjustSize()
+
+        parent = self.parentWidget()
+        self.move(parent.width() - self.width() - MARGIN, MARGIN)
@@ -1,131 +1,210 @@
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QLineEdit,
-    QListWidget, QListWidgetItem, QPushButton,
-    QLabel, QFrame
+    QListView, QPushButton, QLabel, QFrame,
+    QStyle, QStyledItemDelegate
 )
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QFont
+from PySide6.QtCore import (
+    Qt, QAbstractListModel, QModelIndex, QRectF, QSize, QTimer
+)
+from PySide6.QtGui import QColor, QFont, QPainter, QPen
 from PySide6.QtWidgets import QMessageBox
 
-from services.api import get_users
+from services import trace
+from services.api import get_users_page
+from services.tasks import run_task
+from services.theme import set_role
+from services.user_cache import PAGE_SIZE, get_user_cache
+from services.user_search import TOP_K, UserIndex, normalize_user
+
+# Search runs once typing pauses for this long
+SEARCH_DEBOUNCE_MS = 150
+# While only part of a paging server's users is cached, queries at least
+# this long are sent to the server instead of searching the cached part
+SERVER_QUERY_MIN_CHARS = 3
+# Load more results when scrolled within this many pixels of the end
+SCROLL_PRELOAD_PX = 200
+
+ROW_SPACING = 6
+ROW_PADDING = 10
+
+# (background, border, text) per row state
+ROW_COLORS = {
+    "normal": (QColor("white"), QColor("#e5e7eb"), QColor("#111827")),
+    "hover": (QColor("#eef2ff"), QColor("#2d63c8"), QColor("#111827")),
+    "selected": (QColor("#2d63c8"), QColor("#2d63c8"), QColor("white")),
+}
+
+
+class UserListModel(QAbstractListModel):
+    # Exposes the visible subset of the index rows. Filtering hands over a
+    # list of row positions; no per-row objects are created for the view.
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = []
+        self.visible = []
+
+    def set_rows(self, rows, visible):
+        old = len(self.visible)
+
+        if rows is self.rows and visible == self.visible:
+            return
+
+        # "Show more" only appends; keep the scroll position and selection
+        if (rows is self.rows and old and len(visible) > old
+                and visible[:old] == self.visible):
+            self.beginInsertRows(QModelIndex(), old, len(visible) - 1)
+            self.visible = visible
+            self.endInsertRows()
+            return
+
+        self.beginResetModel()
+        self.rows = rows
+        self.visible = visible
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.visible)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        row = self.rows[self.visible[index.row()]]
+
+        if role == Qt.DisplayRole:
+            return row.full_name
+        if role == Qt.UserRole:
+            return row
+
+        return None
+
+
+class UserDelegate(QStyledItemDelegate):
+    # Paints each user as a two-line card, replacing per-item stylesheets
+
+    def sizeHint(self, option, index):
+        line = option.fontMetrics.height()
+        # Width 0: the view stretches rows to its own width
+        return QSize(
+            0,
+            2 * line + 2 * ROW_PADDING + ROW_SPACING
+        )
+
+    def paint(self, painter, option, index):
+        row = index.data(Qt.UserRole)
+
+        if option.state & QStyle.State_Selected:
+            background, border, text = ROW_COLORS["selected"]
+        elif option.state & QStyle.State_MouseOver:
+            background, border, text = ROW_COLORS["hover"]
+        else:
+            background, border, text = ROW_COLORS["normal"]
+
+        card = QRectF(option.rect).adjusted(
+            0.5, ROW_SPACING / 2 + 0.5, -0.5, -ROW_SPACING / 2 - 0.5
+        )
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(QPen(border, 1))
+        painter.setBrush(background)
+        painter.drawRoundedRect(card, 10, 10)
+
+        text_rect = card.adjusted(ROW_PADDING, ROW_PADDING, -ROW_PADDING, -ROW_PADDING)
+        painter.setPen(text)
+        painter.setFont(option.font)
+        name = option.fontMetrics.elidedText(
+            row.full_name, Qt.ElideRight, int(text_rect.width())
+        )
+        painter.drawText(text_rect, Qt.AlignLeft | Qt.AlignTop, name)
+        painter.drawText(
+            text_rect,
+            Qt.AlignLeft | Qt.AlignBottom,
+            f"Age: {row.age}    Sex: {row.gender}"
+        )
+        painter.restore()
 
 
 class RegisteredUserScreen(QWidget):
     def __init__(self, main):
         super().__init__()
         self.main = main
-        self.users = []
+        self.index = UserIndex([])
+        self.index_task = None
 
-        self.setObjectName("root")
-        self.setStyleSheet("""
-            QWidget#root {
-                background-color: #1e1e1e;
-                color: #111827;
-            }
-        """)
+        # Server-side query results: (query, rows, total), or None while
+        # searching the local index
+        self.remote = None
+        self.remote_task = None
+
+        # Local matches not yet listed
+        self.remaining = 0
+        self.result_limit = TOP_K
+
+        self.cache = get_user_cache()
+        self.cache.changed.connect(self.load_users)
 
         main_layout = QVBoxLayout(self)
         main_layout.setContentsMargins(20, 10, 20, 0)
 
         # ---------------- CARD ----------------
-        card = QFrame()
+        card = set_role(QFrame(), "card", tone="muted")
         card.setMaximumWidth(500)
-        card.setObjectName("card")
-        card.setStyleSheet("""
-            QFrame#card {
-                background-color: #f9fafb;
-                border-radius: 16px;
-            }
-        """)
 
         card_layout = QVBoxLayout(card)
         card_layout.setContentsMargins(25, 25, 25, 25)
         card_layout.setSpacing(12)
 
-        title = QLabel("Select Registered User")
+        title = set_role(QLabel("Select Registered User"), "title")
         title.setFont(QFont("Segoe UI", 18, QFont.Bold))
-        title.setStyleSheet("color: #2d63c8;")
         title.setAlignment(Qt.AlignCenter)
 
         # ---------------- SEARCH ----------------
-        self.search = QLineEdit()
+        self.search = set_role(QLineEdit(), "search")
         self.search.setPlaceholderText("Search user...")
         self.search.setFixedHeight(40)
-        self.search.setStyleSheet("""
-            QLineEdit {
-                border: 1px solid #d1d5db;
-                border-radius: 8px;
-                padding: 8px;
-                font-size: 13px;
-                background: white;
-                color: #111827;
-            }
-        """)
-        self.search.textChanged.connect(self.filter_users)
+        self.search.textChanged.connect(self.schedule_search)
+
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(
+            lambda: self.filter_users(self.search.text())
+        )
 
         # ---------------- LIST ----------------
-        self.list_widget = QListWidget()
-        self.list_widget.setSpacing(6)
-        self.list_widget.setStyleSheet("""
-            QListWidget {
-                border: none;
-                background: transparent;
-                font-size: 13px;
-            }
-
-            QListWidget::item {
-                border-radius: 10px;
-                padding: 10px;
-                background-color: white;
-                color: #111827;
-                border: 1px solid #e5e7eb;
-            }
-
-            QListWidget::item:hover {
-                background-color: #eef2ff;
-                border: 1px solid #2d63c8;
-            }
-
-            QListWidget::item:selected {
-                background-color: #2d63c8;
-                color: white;
-                border: 1px solid #2d63c8;
-            }
-
-            QScrollBar:vertical {
-                border: none;
-                background: transparent;
-                width: 6px;
-            }
-
-            QScrollBar::handle:vertical {
-                background: #cbd5e1;
-                border-radius: 3px;
-            }
-        """)
-        self.list_widget.itemClicked.connect(self.select_user)
+        self.model = UserListModel(self)
+
+        self.list_view = set_role(QListView(), "users")
+        self.list_view.setModel(self.model)
+        self.list_view.setItemDelegate(UserDelegate(self.list_view))
+        # All rows share one height, so the view never measures them
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setMouseTracking(True)
+        self.list_view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.list_view.clicked.connect(self.select_user)
+        self.list_view.verticalScrollBar().valueChanged.connect(
+            self.list_scrolled
+        )
+
+        # ---------------- MORE RESULTS ----------------
+        self.more_btn = set_role(QPushButton(), "link")
+        self.more_btn.setFixedHeight(34)
+        self.more_btn.clicked.connect(self.show_more)
+        self.more_btn.hide()
 
         # ---------------- BACK BUTTON ----------------
-        back_btn = QPushButton("Back")
+        back_btn = set_role(QPushButton("Back"), "secondary")
         back_btn.setFixedHeight(40)
-        back_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #9aa5b1;
-                color: white;
-                font-size: 13px;
-                border-radius: 8px;
-            }
-            QPushButton:hover {
-                background-color: #7f8a96;
-            }
-        """)
         back_btn.clicked.connect(
             lambda: self.main.stack.setCurrentWidget(self.main.user_type)
         )
 
         card_layout.addWidget(title)
         card_layout.addWidget(self.search)
-        card_layout.addWidget(self.list_widget)
+        card_layout.addWidget(self.list_view)
+        card_layout.addWidget(self.more_btn)
         card_layout.addWidget(back_btn)
 
         # Center card
@@ -135,88 +214,174 @@ class RegisteredUserScreen(QWidget):
         center_layout.addStretch()
 
         # ---------------- FOOTER ----------------
-        footer = QLabel(
+        footer = set_role(QLabel(
             "© 2026 PeeSense – AI-Assisted Urinalysis System\n"
             "For Academic & Research Use Only"
-        )
+        ), "footer")
         footer.setAlignment(Qt.AlignCenter)
         footer.setFixedHeight(55)
-        footer.setStyleSheet("""
-            background-color: #2d63c8;
-            color: white;
-            font-size: 11px;
-        """)
 
         main_layout.addLayout(center_layout)
         main_layout.addWidget(footer)
 
+        self.load_users()
+
     # -------------------------------------------------
     def showEvent(self, event):
         super().showEvent(event)
-        self.load_users()
+        # Shows the cached list immediately; a background sync (only when
+        # the cache is stale) updates it through cache.changed.
+        self.cache.refresh()
 
     # -------------------------------------------------
     def load_users(self):
-        try:
-            raw_users = get_users()
-            self.users = self.normalize_users(raw_users)
-            self.populate_list(self.users)
-        except Exception as e:
-            print("Failed to load users:", e)
-            self.users = []
-            self.list_widget.clear()
+        # Indexing 100k users takes about a second on the Pi, so it runs on
+        # the thread pool; the previous index stays searchable meanwhile.
+        if self.index_task is not None:
+            self.index_task.cancel()
+
+        self.index_task = run_task(
+            UserIndex,
+            self.cache.users,
+            on_result=self.index_built
+        )
+
+    def index_built(self, index):
+        self.index_task = None
+        self.index = index
+
+        # Keep the reader's place when a page arrives mid-scroll
+        bar = self.list_view.verticalScrollBar()
+        position = bar.value()
+        self.filter_users(self.search.text())
+        bar.setValue(position)
 
     # -------------------------------------------------
-    def normalize_users(self, raw_users):
-        normalized = []
+    def schedule_search(self):
+        self.result_limit = TOP_K
+        self.search_timer.start()
 
-        for u in raw_users:
-            firstname = (u.get("firstname") or "").strip()
-            middlename = (u.get("middlename") or "").strip()
-            lastname = (u.get("lastname") or "").strip()
+    def filter_users(self, text):
+        self.search_timer.stop()
 
-            full_name = f"{firstname} {middlename} {lastname}".strip()
-            full_name = " ".join(full_name.split())
+        query = " ".join(text.lower().split())
+        if not self.cache.complete and len(query) >= SERVER_QUERY_MIN_CHARS:
+            self.query_server(query)
+            return
 
-            normalized.append({
-                "id": u.get("id"),
-                "full_name": full_name,
-                "age": u.get("age"),
-                "gender": u.get("gender")
-            })
+        self.cancel_remote()
 
-        return normalized
+        results, total = self.index.search(query, self.result_limit)
+        self.model.set_rows(self.index.rows, results)
 
-    # -------------------------------------------------
-    def populate_list(self, users):
-        self.list_widget.clear()
+        self.remaining = total - len(results)
+        if self.remaining > 0:
+            self.more_btn.setText(f"Show more ({self.remaining} more results)")
+            self.more_btn.show()
+        elif not self.cache.complete:
+            self.more_btn.setText("Load more users")
+            self.more_btn.show()
+        else:
+            self.more_btn.hide()
+
+    def show_more(self):
+        if self.remote is not None:
+            self.fetch_remote_page()
+            return
+
+        if self.remaining > 0:
+            self.result_limit += TOP_K
+            self.filter_users(self.search.text())
+        else:
+            # Every cached match is shown; page in more from the server
+            self.cache.fetch_more()
 
-        for user in users:
-            item = QListWidgetItem(
-                f'{user["full_name"]}\nAge: {user["age"]}    Sex: {user["gender"]}'
-            )
-            item.setData(Qt.UserRole, user)
-            self.list_widget.addItem(item)
+    def list_scrolled(self, value):
+        bar = self.list_view.verticalScrollBar()
+        if bar.maximum() and value >= bar.maximum() - SCROLL_PRELOAD_PX:
+            self.show_more()
 
     # -------------------------------------------------
-    def filter_users(self, text):
-        text = text.lower().strip()
+    def query_server(self, query):
+        if self.remote is not None and self.remote[0] == query:
+            return
 
-        filtered = [
-            u for u in self.users
-            if text in u["full_name"].lower()
-        ]
+        self.cancel_remote()
+        self.remote = (query, [], None)
+        self.model.set_rows([], [])
+        self.more_btn.setText("Searching...")
+        self.more_btn.show()
+        self.fetch_remote_page()
 
-        self.populate_list(filtered)
+    def fetch_remote_page(self):
+        query, rows, total = self.remote
+
+        if self.remote_task is not None or (
+            total is not None and len(rows) >= total
+        ):
+            return
+
+        self.remote_task = run_task(
+            get_users_page,
+            PAGE_SIZE,
+            len(rows),
+            query,
+            on_result=lambda result: self.remote_page_loaded(query, result),
+            on_error=self.remote_page_failed
+        )
+
+    def remote_page_loaded(self, query, result):
+        self.remote_task = None
+        if self.remote is None or self.remote[0] != query:
+            return
+
+        users, total = result
+        _, rows, _ = self.remote
+
+        if total is None:
+            # The server ignored the paging parameters and sent its whole
+            # table; cache it and search locally from now on.
+            self.remote = None
+            self.cache.refresh(force=True)
+            return
+
+        rows.extend(normalize_user(u) for u in users)
+        total = total if users else len(rows)
+        self.remote = (query, rows, total)
+        self.model.set_rows(rows, list(range(len(rows))))
+
+        remaining = total - len(rows)
+        if remaining > 0:
+            self.more_btn.setText(f"Show more ({remaining} more results)")
+            self.more_btn.show()
+        else:
+            self.more_btn.hide()
+
+    def remote_page_failed(self, message):
+        self.remote_task = None
+        print("Server search failed:", message)
+
+        # Fall back to whatever is cached
+        query = self.remote[0] if self.remote else ""
+        self.remote = None
+        results, _ = self.index.search(query, self.result_limit)
+        self.model.set_rows(self.index.rows, results)
+        self.more_btn.hide()
+
+    def cancel_remote(self):
+        if self.remote_task is not None:
+            self.remote_task.cancel()
+            self.remote_task = None
+        self.remote = None
 
     # -------------------------------------------------
-    def select_user(self, item):
-        user = item.data(Qt.UserRole)
+    def select_user(self, index):
+        user = index.data(Qt.UserRole)
 
         reply = QMessageBox.question(
             self,
             "Confirm Selection",
-            f'Select user:\n\n{user["full_name"]}?',
+            f'Select user:\n\n{user.full_name}?',
             QMessageBox.Yes | QMessageBox.No,
             QMessageBox.No
         )
@@ -224,11 +389,13 @@ class RegisteredUserScreen(QWidget):
         if reply != QMessageBox.Yes:
             return
 
+        trace.step("user_selected")
+
         self.main.upload.set_user_data(
-            user["full_name"],
-            str(user["age"]),
-            user["gender"],
-            user["id"]
+            user.full_name,
+            str(user.age),
+            user.gender,
+            user.id
         )
 
         self.main.stack.setCurrentWidget(self.main.upload)
\ No newline at end of file
@@ -1,4 +1,5 @@
-import qrcode
+from collections import OrderedDict
+
 from PySide6.QtCore import QDateTime, Qt
 from PySide6.QtGui import QPixmap
 from PySide6.QtWidgets import (
@@ -11,71 +12,53 @@ from PySide6.QtWidgets import (
     QHBoxLayout
 )
 
+from services import trace
+from services.outbox import get_outbox
+from services.qr import render_qr
+from services.theme import set_role, set_screen_role
+
+QR_SIZE = 130
+# Rendered QR codes kept for results shown again (e.g. a queued sample
+# delivered after the patient left)
+QR_CACHE_SIZE = 16
+
 
 class ResultScreen(QWidget):
     def __init__(self, main):
         super().__init__()
         self.main = main
+        set_screen_role(self, "surface")
+
+        # (outbox key, name, age, gender) while showing a queued sample
+        self.pending = None
+
+        # result_url -> QPixmap, least recently shown first
+        self.qr_cache = OrderedDict()
+
+        outbox = get_outbox()
+        outbox.delivered.connect(self.pending_delivered)
+        outbox.failed.connect(self.pending_failed)
+
         self.setup_ui()
 
     def setup_ui(self):
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #ffffff;
-                font-family: Segoe UI, Arial;
-                color: #111827;
-            }
-
-            QFrame#card {
-                background-color: white;
-                border-radius: 12px;
-                padding: 16px;
-            }
-
-            QLabel#heading {
-                font-size: 15px;
-                font-weight: 600;
-                color: #111827;
-            }
-
-            QLabel#resultText {
-                font-size: 11px;
-                color: #111827;
-            }
-
-            QPushButton {
-                background-color: #2563eb;
-                color: white;
-                padding: 6px 14px;
-                border-radius: 6px;
-                font-size: 11px;
-                min-height: 30px;
-            }
-
-            QPushButton:hover {
-                background-color: #1e40af;
-            }
-        """)
-
         main_layout = QVBoxLayout(self)
         main_layout.setContentsMargins(15, 15, 15, 15)
         main_layout.setAlignment(Qt.AlignCenter)
 
-        card = QFrame()
-        card.setObjectName("card")
+        card = set_role(QFrame(), "card")
         card.setMaximumWidth(380)
         card.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Minimum)
 
         card_layout = QVBoxLayout(card)
+        card_layout.setContentsMargins(25, 25, 25, 25)
         card_layout.setSpacing(10)
         card_layout.setAlignment(Qt.AlignCenter)
 
-        heading = QLabel("Urinalysis Result")
-        heading.setObjectName("heading")
+        heading = set_role(QLabel("Urinalysis Result"), "heading")
         heading.setAlignment(Qt.AlignCenter)
 
-        self.result_label = QLabel("Waiting for result...")
-        self.result_label.setObjectName("resultText")
+        self.result_label = set_role(QLabel("Waiting for result..."), "result")
         self.result_label.setWordWrap(True)
         self.result_label.setAlignment(Qt.AlignCenter)
 
@@ -84,7 +67,9 @@ class ResultScreen(QWidget):
         self.qr_label.setFixedSize(140, 140)
         self.qr_label.hide()
 
-        self.back_btn = QPushButton("Test Another Sample")
+        self.back_btn = set_role(
+            QPushButton("Test Another Sample"), "action", variant="small"
+        )
         self.back_btn.clicked.connect(self.go_home)
 
         card_layout.addWidget(heading)
@@ -101,6 +86,7 @@ class ResultScreen(QWidget):
         main_layout.addWidget(card)
 
     def set_result(self, data, name="", age="", gender=""):
+        self.pending = None
         self.qr_label.clear()
         self.qr_label.hide()
 
@@ -133,34 +119,59 @@ class ResultScreen(QWidget):
         if result_url:
             self.generate_qr(result_url)
 
-    def generate_qr(self, url):
-        qr = qrcode.make(url)
-        qr_path = "temp_qr.png"
-        qr.save(qr_path)
-
-        pixmap = QPixmap(qr_path)
-        pixmap = pixmap.scaled(
-            130,
-            130,
-            Qt.KeepAspectRatio,
-            Qt.SmoothTransformation
+    def set_pending(self, key, name="", age="", gender=""):
+        self.qr_label.clear()
+        self.qr_label.hide()
+        self.pending = (key, name, age, gender)
+
+        self.result_label.setText(
+            f"Patient Name: {name}\n"
+            f"Age: {age}\n"
+            f"Gender: {gender}\n\n"
+            "The server is unreachable. The sample has been saved on this "
+            "kiosk and will be analyzed automatically once the connection "
+            "returns."
         )
 
+    def pending_delivered(self, key, data):
+        if self.pending and self.pending[0] == key:
+            _, name, age, gender = self.pending
+            self.set_result(data, name=name, age=age, gender=gender)
+
+    def pending_failed(self, key, message):
+        if self.pending and self.pending[0] == key:
+            self.pending = None
+            self.result_label.setText(f"Analysis failed:\n{message}")
+
+    def generate_qr(self, url):
+        pixmap = self.qr_cache.get(url)
+
+        if pixmap is None:
+            pixmap = QPixmap.fromImage(render_qr(url, QR_SIZE))
+            self.qr_cache[url] = pixmap
+
+            if len(self.qr_cache) > QR_CACHE_SIZE:
+                self.qr_cache.popitem(last=False)
+        else:
+            self.qr_cache.move_to_end(url)
+
         self.qr_label.setPixmap(pixmap)
         self.qr_label.show()
 
     def reset(self):
+        self.pending = None
         self.result_label.setText("Waiting for result...")
         self.qr_label.clear()
         self.qr_label.hide()
 
     def go_home(self):
+        trace.end("completed")
         self.reset()
 
-        if hasattr(self.main, "upload"):
+        if self.main.is_built("upload"):
             self.main.upload.reset()
 
-        if hasattr(self.main, "info"):
+        if self.main.is_built("info"):
             self.main.info.reset()
 
         self.main.stack.setCurrentWidget(self.main.home)
\ No newline at end of file
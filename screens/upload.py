@@ -1,8 +1,30 @@
-import os
+import time
 
-IS_RPI = True
+# Keep the camera running with encoding paused while the screen is hidden,
+# so returning to it skips camera start-up and auto-exposure settling.
+WARM_STANDBY = False
 
-from PySide6.QtCore import Qt, QProcess, QTimer
+# Restart the camera when no frame has arrived for this long
+WATCHDOG_TIMEOUT_MS = 5000
+
+# "still":  small, cheap preview stream; Analyze takes a full-resolution
+#           still (rpicam-still on the Pi camera).
+# "stream": Analyze sends the current preview frame.
+CAPTURE_MODE = "still"
+
+# (width, height, quality) of the preview stream for each capture mode
+PREVIEW_STREAM = {
+    "still": (320, 240, 50),
+    "stream": (640, 480, 75),
+}
+
+# (width, height, quality) of the full-resolution still
+STILL = (2028, 1520, 93)
+
+# Give up on an analysis request after this long
+ANALYSIS_TIMEOUT_MS = 90000
+
+from PySide6.QtCore import Qt, QTimer
 from PySide6.QtGui import QPixmap
 from PySide6.QtWidgets import (
     QWidget,
@@ -11,96 +33,104 @@ from PySide6.QtWidgets import (
     QLabel,
     QPushButton,
     QFrame,
-    QMessageBox,
-    QApplication
+    QMessageBox
 )
 
-from services.api import analyze_sample
+from services import trace
+from services.api import analyze_sample, is_unreachable
+from services.archive import archive_sample
+from services.outbox import get_outbox, new_key
+from services.tasks import run_task
+from services.camera import CaptureWorker
+from services.camera_source import open_camera
+from services.theme import set_role, set_screen_role
 
 
 class UploadScreen(QWidget):
     def __init__(self, main):
         super().__init__()
         self.main = main
+        set_screen_role(self, "surface")
 
         self.name = ""
         self.age = ""
         self.sex = ""
         self.user_id = ""
-        self.image_path = ""
+        # Outbox key of a registration that is still waiting to be sent
+        self.user_key = None
 
-        self.process = None
-        self._buffer = bytearray()  # Raw bytes buffer for MJPEG parsing
+        self.worker = None
         self.last_frame = None
+        self.analysis_task = None
+        self.analysis_key = None
+        self.analysis_frame = None
 
         self.preview_width = 640
         self.preview_height = 480
 
+        # Set while waiting for the first frame after resuming from standby
+        self.awaiting_frame = False
+
+        self.watchdog = QTimer(self)
+        self.watchdog.setInterval(1000)
+        self.watchdog.timeout.connect(self.check_camera_stalled)
+
         self.setup_ui()
-        self.start_camera_stream()
+
+        if WARM_STANDBY:
+            self.start_camera_stream(paused=True)
 
     # ==========================================================
     # UI
     # ==========================================================
 
     def setup_ui(self):
-        self.setStyleSheet("""
-            QWidget { background-color: #ffffff; font-family: Segoe UI, Arial; }
-            QLabel#title { font-size: 20px; font-weight: 600; color: #1f2937; }
-            QLabel#subtitle { font-size: 13px; color: #6b7280; }
-            QFrame#card { background-color: white; border-radius: 16px; padding: 24px; }
-            QPushButton {
-                background-color: #2563eb;
-                color: white;
-                font-size: 14px;
-                border-radius: 10px;
-                min-height: 42px;
-                padding: 6px 14px;
-            }
-            QPushButton:disabled {
-                background-color: #9ca3af;
-            }
-        """)
-
         main_layout = QVBoxLayout(self)
         main_layout.setAlignment(Qt.AlignCenter)
 
-        self.card = QFrame()
-        self.card.setObjectName("card")
+        self.card = set_role(QFrame(), "card")
         card_layout = QVBoxLayout(self.card)
+        card_layout.setContentsMargins(33, 33, 33, 33)
         card_layout.setSpacing(15)
         card_layout.setAlignment(Qt.AlignCenter)
 
-        title = QLabel("Urine Sample Capture")
-        title.setObjectName("title")
+        title = set_role(QLabel("Urine Sample Capture"), "heading", variant="large")
         title.setAlignment(Qt.AlignCenter)
 
-        subtitle = QLabel("Ensure proper focus and stable lighting before analysis.")
-        subtitle.setObjectName("subtitle")
+        subtitle = set_role(
+            QLabel("Ensure proper focus and stable lighting before analysis."),
+            "caption"
+        )
         subtitle.setAlignment(Qt.AlignCenter)
 
-        self.preview_label = QLabel()
+        self.preview_label = set_role(QLabel(), "preview")
         self.preview_label.setFixedSize(self.preview_width, self.preview_height)
         self.preview_label.setAlignment(Qt.AlignCenter)
-        self.preview_label.setStyleSheet(
-            "background-color: #111827; border-radius: 12px;"
-        )
 
-        self.analyze_btn = QPushButton("Analyze Sample")
+        self.focus_label = set_role(QLabel("Focus: --"), "caption")
+        self.focus_label.setAlignment(Qt.AlignCenter)
+
+        self.analyze_btn = set_role(QPushButton("Analyze Sample"), "action")
         self.analyze_btn.clicked.connect(self.start_analysis)
 
-        self.refresh_btn = QPushButton("Refresh Camera")
+        self.refresh_btn = set_role(QPushButton("Refresh Camera"), "action")
         self.refresh_btn.clicked.connect(self.refresh_camera)
 
+        self.cancel_btn = set_role(QPushButton("Cancel"), "action")
+        self.cancel_btn.clicked.connect(self.cancel_analysis)
+        self.cancel_btn.hide()
+
         button_layout = QHBoxLayout()
         button_layout.setAlignment(Qt.AlignCenter)
         button_layout.addWidget(self.refresh_btn)
         button_layout.addSpacing(10)
         button_layout.addWidget(self.analyze_btn)
+        button_layout.addWidget(self.cancel_btn)
 
         card_layout.addWidget(title)
         card_layout.addWidget(subtitle)
         card_layout.addWidget(self.preview_label)
+        card_layout.addWidget(self.focus_label)
         card_layout.addLayout(button_layout)
 
         main_layout.addWidget(self.card)
@@ -109,145 +139,155 @@ class UploadScreen(QWidget):
     # CAMERA CONTROL
     # ==========================================================
 
-    def start_camera_stream(self):
-        if not IS_RPI:
+    def showEvent(self, event):
+        super().showEvent(event)
+
+        if self.worker and self.worker.paused:
+            self.resume_camera_stream()
+        elif not self.worker:
+            self.start_camera_stream()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+
+        if WARM_STANDBY and self.worker:
+            self.pause_camera_stream()
+        else:
+            self.stop_camera_stream()
+
+    def start_camera_stream(self, paused=False):
+        source = open_camera(PREVIEW_STREAM[CAPTURE_MODE], STILL, WARM_STANDBY)
+        if source is None:
             return
 
         self.set_buttons_enabled(False)
         self.refresh_btn.setText("Starting...")
         self.analyze_btn.setText("Waiting...")
-        self._buffer = bytearray()
-
-        self.process = QProcess(self)
-        self.process.setProcessChannelMode(QProcess.SeparateChannels)
-        self.process.readyReadStandardOutput.connect(self.read_stream)
-
-        cmd = [
-            "rpicam-vid",
-            "-t", "0",
-            "--codec", "mjpeg",
-            "--width", "640",
-            "--height", "480",
-            "--framerate", "20",
-            "--quality", "75",       # Lower quality = less data = smoother stream
-            "--inline",
-            "--nopreview",
-            "-o", "-"
-        ]
-
-        self.process.start(cmd[0], cmd[1:])
-
-        if not self.process.waitForStarted(3000):
-            QMessageBox.critical(self, "Camera Error", "Failed to start camera.")
-            self.process = None
-            return
 
-        QTimer.singleShot(3000, self.camera_ready)
+        # Frame parsing and JPEG decoding happen on the worker thread;
+        # the GUI thread only receives the newest decoded image.
+        self.worker = CaptureWorker(
+            source,
+            self.preview_width,
+            self.preview_height,
+            paused,
+            self
+        )
+        self.worker.frame_ready.connect(self.show_frame)
+        self.worker.ready.connect(self.camera_ready)
+        self.worker.failed.connect(self.camera_failed)
+        self.worker.still_ready.connect(self.still_captured)
+        self.worker.still_failed.connect(self.still_failed)
+        self.worker.start()
+
+        if not paused:
+            self.watchdog.start()
+
+    def pause_camera_stream(self):
+        self.watchdog.stop()
+        self.worker.pause()
+        self.awaiting_frame = False
+        self.last_frame = None
+        self.preview_label.clear()
+        self.focus_label.setText("Focus: --")
+
+    def resume_camera_stream(self):
+        # Exposure already settled while paused, so the first frame that
+        # arrives means the camera is ready.
+        self.set_buttons_enabled(False)
+        self.analyze_btn.setText("Waiting...")
+        self.awaiting_frame = True
+        self.worker.resume()
+        self.watchdog.start()
 
     def camera_ready(self):
+        if not self.worker or self.worker.paused or self.analysis_task:
+            return
+
+        trace.step("camera_ready")
+
         self.refresh_btn.setText("Refresh Camera")
         self.analyze_btn.setText("Analyze Sample")
         self.set_buttons_enabled(True)
 
-    def stop_camera_stream(self):
-        if self.process:
-            self.process.readyReadStandardOutput.disconnect()
-            self.process.kill()
-            self.process.waitForFinished(3000)
-            self.process = None
+    def check_camera_stalled(self):
+        if not self.worker or self.worker.paused or self.worker.capturing_still:
+            return
 
-        self._buffer = bytearray()
+        stalled_ms = (time.monotonic() - self.worker.last_frame_at) * 1000
+        if stalled_ms > WATCHDOG_TIMEOUT_MS:
+            self.refresh_camera()
+
+    def camera_failed(self, message):
+        self.stop_camera_stream()
+        self.refresh_btn.setText("Refresh Camera")
+        self.refresh_btn.setEnabled(True)
+        QMessageBox.critical(self, "Camera Error", message)
+
+    def stop_camera_stream(self):
+        self.watchdog.stop()
+
+        if self.worker:
+            self.worker.frame_ready.disconnect()
+            self.worker.ready.disconnect()
+            self.worker.failed.disconnect()
+            self.worker.still_ready.disconnect()
+            self.worker.still_failed.disconnect()
+
+            worker, self.worker = self.worker, None
+            # Deleted once its thread has ended, even if that outlasts
+            # stop()'s wait
+            worker.finished.connect(worker.deleteLater)
+            worker.stop()
+            if worker.isFinished():
+                worker.deleteLater()
+
+        self.awaiting_frame = False
         self.last_frame = None
         self.preview_label.clear()
+        self.focus_label.setText("Focus: --")
 
     def refresh_camera(self):
         self.set_buttons_enabled(False)
         self.refresh_btn.setText("Restarting...")
         self.analyze_btn.setText("Waiting...")
-        QApplication.processEvents()
 
+        # stop_camera_stream() waits for the camera process to exit and
+        # release the device, so the new one can start straight away.
         self.stop_camera_stream()
-        QTimer.singleShot(500, self.start_camera_stream)
+        self.start_camera_stream()
 
     # ==========================================================
-    # STREAM READER — proper sequential MJPEG frame extraction
+    # PREVIEW
     # ==========================================================
 
-    def read_stream(self):
-        if not self.process:
+    def show_frame(self):
+        if not self.worker:
             return
 
-        # Append new chunk to buffer
-        chunk = self.process.readAllStandardOutput()
-        self._buffer.extend(bytes(chunk))
-
-        # Cap buffer size to avoid memory bloat
-        if len(self._buffer) > 4_000_000:
-            # Find the last SOI marker and keep from there
-            last_soi = self._buffer.rfind(b'\xff\xd8')
-            if last_soi != -1:
-                self._buffer = self._buffer[last_soi:]
-            else:
-                self._buffer = bytearray()
+        latest = self.worker.take_frame()
+        if latest is None:
             return
 
-        # Extract ALL complete frames from buffer, display only the latest
-        frames_found = []
-        search_start = 0
-
-        while True:
-            # Find next SOI (start of JPEG)
-            soi = self._buffer.find(b'\xff\xd8', search_start)
-            if soi == -1:
-                break
-
-            # Find EOI (end of JPEG) after SOI
-            eoi = self._buffer.find(b'\xff\xd9', soi + 2)
-            if eoi == -1:
-                # Incomplete frame — keep buffer from this SOI onward
-                self._buffer = self._buffer[soi:]
-                break
-
-            # Complete frame found
-            frame = bytes(self._buffer[soi:eoi + 2])
-            frames_found.append(frame)
-            search_start = eoi + 2
-        else:
-            # Loop exited normally (no break) — all data consumed
-            self._buffer = bytearray()
-
-        if search_start > 0 and search_start < len(self._buffer):
-            # Trim consumed bytes, keep remainder
-            self._buffer = self._buffer[search_start:]
-
-        if not frames_found:
-            return
-
-        # Only render the most recent frame to avoid falling behind
-        latest = frames_found[-1]
-        self.last_frame = latest
+        frame, image, sharpness = latest
+        self.last_frame = frame
+        self.preview_label.setPixmap(QPixmap.fromImage(image))
+        self.focus_label.setText(f"Focus: {sharpness:.0f}")
 
-        pixmap = QPixmap()
-        if not pixmap.loadFromData(latest):
-            return
-
-        scaled = pixmap.scaled(
-            self.preview_width,
-            self.preview_height,
-            Qt.KeepAspectRatio,
-            Qt.FastTransformation
-        )
-        self.preview_label.setPixmap(scaled)
+        if self.awaiting_frame:
+            self.awaiting_frame = False
+            self.camera_ready()
 
     # ==========================================================
     # USER DATA
     # ==========================================================
 
-    def set_user_data(self, name, age, sex, user_id):
+    def set_user_data(self, name, age, sex, user_id, user_key=None):
         self.name = name
         self.age = age
         self.sex = sex
         self.user_id = user_id
+        self.user_key = user_key
 
     # ==========================================================
     # ANALYSIS
@@ -258,44 +298,133 @@ class UploadScreen(QWidget):
             QMessageBox.warning(self, "No Frame", "Camera not ready yet.")
             return
 
-        self.set_buttons_enabled(False)
-        self.analyze_btn.setText("Analyzing...")
-        QApplication.processEvents()
+        trace.step("analysis_started")
 
-        self.image_path = os.path.abspath("captured_sample.jpg")
+        if CAPTURE_MODE == "still":
+            self.set_buttons_enabled(False)
+            self.analyze_btn.setText("Capturing...")
+            self.worker.request_still()
+            return
 
-        try:
-            with open(self.image_path, "wb") as f:
-                f.write(self.last_frame)
+        self.analyze_frame(self.worker.best_frame() or self.last_frame)
 
-            self.perform_analysis()
+    def still_captured(self, frame):
+        self.analyze_frame(frame)
 
-        except Exception as e:
-            QMessageBox.critical(self, "Capture Error", str(e))
+    def still_failed(self, message):
+        # Fall back to the sharpest preview frame rather than losing the sample
+        if self.last_frame:
+            self.analyze_frame(self.worker.best_frame() or self.last_frame)
+            return
 
+        QMessageBox.critical(self, "Capture Error", message)
         self.analyze_btn.setText("Analyze Sample")
         self.set_buttons_enabled(True)
 
-    def perform_analysis(self):
-        try:
-            response = analyze_sample(
-                self.user_id,
-                self.age,
-                self.sex,
-                self.image_path
-            )
+    def analyze_frame(self, frame):
+        trace.step("sample_captured")
+        self.set_buttons_enabled(False)
+        self.analyze_btn.setText("Analyzing...")
+        self.cancel_btn.show()
+
+        # The frame is uploaded straight from memory; the optional audit
+        # copy is written in the background.
+        archive_sample(frame, self.user_id)
 
-            self.main.result.set_result(
-                response,
-                name=self.name,
-                age=self.age,
-                gender=self.sex
-            )
+        # One key per sample, reused if the upload has to be retried later
+        self.analysis_key = new_key()
+        self.analysis_frame = frame
 
-            self.main.stack.setCurrentWidget(self.main.result)
+        if self.user_id is None and self.user_key:
+            # The queued registration may have been delivered since
+            registered = get_outbox().result(self.user_key)
+            if registered:
+                self.user_id = registered.get("id")
 
-        except Exception as e:
-            QMessageBox.critical(self, "Analysis Error", str(e))
+        if self.user_id is None and self.user_key:
+            # The patient's registration is itself still queued
+            self.defer_analysis()
+            return
+
+        # The request runs on the thread pool so the preview keeps
+        # updating and Cancel stays responsive.
+        self.analysis_task = run_task(
+            analyze_sample,
+            self.user_id,
+            self.age,
+            self.sex,
+            frame,
+            idempotency_key=self.analysis_key,
+            on_result=self.analysis_finished,
+            on_error=self.analysis_failed,
+            on_progress=self.analyze_btn.setText,
+            timeout_ms=ANALYSIS_TIMEOUT_MS,
+            progress=True
+        )
+
+    def analysis_finished(self, response):
+        trace.step("result_received")
+        self.end_analysis()
+
+        self.main.result.set_result(
+            response,
+            name=self.name,
+            age=self.age,
+            gender=self.sex
+        )
+
+        self.main.stack.setCurrentWidget(self.main.result)
+
+    def analysis_failed(self, message):
+        error = self.analysis_task.error
+
+        if is_unreachable(error):
+            self.defer_analysis()
+            return
+
+        trace.step("analysis_failed")
+        self.end_analysis()
+        QMessageBox.critical(self, "Analysis Error", message)
+
+    def defer_analysis(self):
+        # Keep the sample in the outbox; the result screen fills in once
+        # the server is reachable again.
+        get_outbox().enqueue(
+            "analyze",
+            self.analysis_key,
+            {
+                "user_id": self.user_id,
+                "age": self.age,
+                "gender": self.sex
+            },
+            image=self.analysis_frame,
+            depends_on=self.user_key
+        )
+        trace.step("analysis_queued")
+
+        self.end_analysis()
+
+        self.main.result.set_pending(
+            self.analysis_key,
+            name=self.name,
+            age=self.age,
+            gender=self.sex
+        )
+
+        self.main.stack.setCurrentWidget(self.main.result)
+
+    def cancel_analysis(self):
+        if self.analysis_task and self.analysis_task.cancel():
+            trace.step("analysis_cancelled")
+            self.end_analysis()
+
+    def end_analysis(self):
+        self.analysis_task = None
+        self.analysis_frame = None
+        self.cancel_btn.hide()
+        self.analyze_btn.setText("Analyze Sample")
+        self.refresh_btn.setText("Refresh Camera")
+        self.set_buttons_enabled(self.worker is not None)
 
     # ==========================================================
     # RESET
@@ -306,18 +435,22 @@ class UploadScreen(QWidget):
         self.age = ""
         self.sex = ""
         self.user_id = ""
-        self.image_path = ""
+        self.user_key = None
+
+        if self.analysis_task:
+            self.analysis_task.cancel()
+        self.analysis_task = None
+        self.cancel_btn.hide()
 
-        self._buffer = bytearray()
         self.last_frame = None
         self.preview_label.clear()
+        self.focus_label.setText("Focus: --")
 
         self.analyze_btn.setText("Analyze Sample")
         self.refresh_btn.setText("Refresh Camera")
         self.set_buttons_enabled(False)
 
-        self.stop_camera_stream()
-        QTimer.singleShot(300, self.start_camera_stream)
+        # The camera restarts (or resumes) when the screen is shown again
 
     # ==========================================================
     # UTIL
@@ -2,80 +2,42 @@ from PySide6.QtWidgets import QWidget, QVBoxLayout, QPushButton, QLabel, QFrame
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QFont
 
+from services import trace
+from services.theme import set_role, set_screen_role
+
 
 class UserTypeScreen(QWidget):
     def __init__(self, main):
         super().__init__()
         self.main = main
-
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #eef2f7;
-                color: #1a2b49;
-            }
-        """)
+        set_screen_role(self, "backdrop")
 
         main_layout = QVBoxLayout(self)
         main_layout.setContentsMargins(25, 10, 25, 0)
 
         # ---------------- CARD ----------------
-        card = QFrame()
+        card = set_role(QFrame(), "card")
         card.setMaximumWidth(420)
-        card.setStyleSheet("""
-            QFrame {
-                background-color: white;
-                border-radius: 16px;
-            }
-        """)
 
         card_layout = QVBoxLayout(card)
         card_layout.setContentsMargins(30, 30, 30, 30)
         card_layout.setSpacing(15)
 
-        title = QLabel("Select User Type")
+        title = set_role(QLabel("Select User Type"), "title")
         title.setFont(QFont("Segoe UI", 20, QFont.Bold))
-        title.setStyleSheet("color: #2d63c8;")
         title.setAlignment(Qt.AlignCenter)
 
-        # ---------------- BUTTON STYLE ----------------
-        button_style_primary = """
-            QPushButton {
-                background-color: #2d63c8;
-                color: white;
-                font-size: 14px;
-                border-radius: 8px;
-            }
-            QPushButton:hover {
-                background-color: #1e4ea8;
-            }
-        """
-
-        button_style_secondary = """
-            QPushButton {
-                background-color: #9aa5b1;
-                color: white;
-                font-size: 14px;
-                border-radius: 8px;
-            }
-            QPushButton:hover {
-                background-color: #7f8a96;
-            }
-        """
-
-        registered_btn = QPushButton("Already Registered")
+        registered_btn = set_role(QPushButton("Already Registered"), "primary")
         registered_btn.setFixedHeight(45)
-        registered_btn.setStyleSheet(button_style_primary)
         registered_btn.clicked.connect(self.go_registered)
 
-        new_btn = QPushButton("New User")
+        new_btn = set_role(QPushButton("New User"), "primary")
         new_btn.setFixedHeight(45)
-        new_btn.setStyleSheet(button_style_primary)
         new_btn.clicked.connect(self.go_new)
 
         # ---------------- BACK BUTTON ----------------
-        back_btn = QPushButton("Back")
+        back_btn = set_role(QPushButton("Back"), "secondary")
         back_btn.setFixedHeight(40)
-        back_btn.setStyleSheet(button_style_secondary)
         back_btn.clicked.connect(self.go_back)
 
         card_layout.addWidget(title)
@@ -90,27 +52,24 @@ class UserTypeScreen(QWidget):
         center_layout.addStretch()
 
         # ---------------- FOOTER ----------------
-        footer = QLabel(
+        footer = set_role(QLabel(
             "© 2026 PeeSense – AI-Assisted Urinalysis System\n"
             "For Academic & Research Use Only"
-        )
+        ), "footer")
         footer.setAlignment(Qt.AlignCenter)
         footer.setFixedHeight(55)
-        footer.setStyleSheet("""
-            background-color: #2d63c8;
-            color: white;
-            font-size: 11px;
-        """)
 
         main_layout.addLayout(center_layout)
         main_layout.addWidget(footer)
 
     def go_registered(self):
-        self.main.registered.load_users()
+        trace.step("registered_patient")
         self.main.stack.setCurrentWidget(self.main.registered)
 
     def go_new(self):
+        trace.step("new_patient")
         self.main.stack.setCurrentWidget(self.main.info)
 
     def go_back(self):
+        trace.end("cancelled")
         self.main.stack.setCurrentWidget(self.main.home)
\ No newline at end of file
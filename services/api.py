@@ -1,11 +1,165 @@
+import os
+import threading
+import time
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from services import metrics
+from services.json_stream import iter_json
+from services.preprocess import default_pipeline
+
+BASE_URL = os.environ.get("PEESENSE_API_URL", "http://192.168.0.229:5000")
+
+# (connect, read) timeouts in seconds. /analyze waits on model inference,
+# so its read timeout is the longest.
+TIMEOUTS = {
+    "/analyze": (3.05, 60),
+    "/info": (3.05, 10),
+    "/users": (3.05, 15),
+}
+DEFAULT_TIMEOUT = (3.05, 10)
+
+POOL_SIZE = 4
+# Read size for streamed responses
+STREAM_CHUNK = 16384
+RETRIES = 3
+RETRY_BACKOFF = 0.5
+
+# Upper bounds, in bytes, for sample upload sizes
+UPLOAD_BUCKETS = tuple(2 ** n * 1024 for n in range(4, 14))
+
+UPLOAD_BYTES = metrics.histogram(
+    "upload_bytes",
+    "Sample size sent to /analyze after preprocessing",
+    buckets=UPLOAD_BUCKETS
+)
+UPLOAD_BYTES_IN = metrics.counter(
+    "upload_bytes_in_total",
+    "Sample bytes captured, before preprocessing"
+)
+UPLOAD_BYTES_SAVED = metrics.counter(
+    "upload_bytes_saved_total",
+    "Bytes preprocessing removed from sample uploads"
+)
+PREPROCESS_TIME = metrics.histogram(
+    "upload_preprocess_seconds",
+    "Time spent preparing a sample for upload"
+)
+
+
+class ServerUnreachable(Exception):
+    # The server could not be reached or is temporarily unavailable; the
+    # request may not have been processed and is safe to retry with the
+    # same idempotency key.
+    pass
 
-BASE_URL = "http://192.168.0.229:5000"
 
-def analyze_sample(user_id, age, gender, image_path):
-    with open(image_path, "rb") as f:
+def is_unreachable(error):
+    return isinstance(error, (ServerUnreachable, TimeoutError))
+
+
+class ApiClient:
+    def __init__(self, base_url=BASE_URL, pipeline=None):
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+
+        # Preprocessing applied to every sample before upload
+        self.pipeline = pipeline or default_pipeline()
+        self.last_upload = None
+
+        # Reads and 5xx responses are only retried for idempotent methods
+        # (GET /users). Failed connects are retried for every method, which
+        # is safe because nothing reached the server.
+        retry = Retry(
+            total=RETRIES,
+            backoff_factor=RETRY_BACKOFF,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            raise_on_status=False
+        )
+
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=POOL_SIZE,
+            max_retries=retry
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _request(self, method, path, idempotency_key=None, **kwargs):
+        kwargs.setdefault("timeout", TIMEOUTS.get(path, DEFAULT_TIMEOUT))
+
+        # Lets the server drop duplicates when a retried request had in
+        # fact been processed the first time
+        if idempotency_key:
+            kwargs["headers"] = {"Idempotency-Key": idempotency_key}
+
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            _request_error(method, path, "unreachable")
+            raise ServerUnreachable(f"Server unreachable: {e}") from e
+
+        # Until the headers arrived; streamed bodies are read afterwards
+        metrics.histogram(
+            "http_request_seconds",
+            "API request latency by endpoint",
+            method=method,
+            path=path
+        ).observe(time.perf_counter() - started)
+
+        if response.status_code >= 400:
+            _request_error(method, path, response.status_code)
+
+        if response.status_code in (502, 503, 504):
+            raise ServerUnreachable(f"Server unavailable: {response.status_code}")
+
+        return response
+
+    def warm_up(self):
+        # Open a pooled connection in the background so the first patient
+        # does not pay for the TCP handshake.
+        def connect():
+            try:
+                self._request("HEAD", "/", timeout=DEFAULT_TIMEOUT)
+            except (requests.RequestException, ServerUnreachable):
+                pass
+
+        threading.Thread(target=connect, daemon=True).start()
+
+    # ==========================================================
+    # ENDPOINTS
+    # ==========================================================
+
+    def analyze_sample(self, user_id, age, gender, image, progress=None,
+                       idempotency_key=None):
+        # image: JPEG bytes/bytearray/memoryview, a binary file-like object,
+        # or a path to a JPEG file. progress, if given, is called with short
+        # status messages.
+        if isinstance(image, (str, os.PathLike)):
+            with open(image, "rb") as f:
+                return self.analyze_sample(
+                    user_id, age, gender, f, progress, idempotency_key
+                )
+
+        if hasattr(image, "read"):
+            image = image.read()
+
+        if progress:
+            progress("Preparing sample...")
+
+        image, content_type, upload = self.pipeline.process(bytes(image))
+        _record_upload(upload)
+        extension = "png" if content_type == "image/png" else "jpg"
+
+        if progress:
+            progress("Sending sample...")
+
         files = {
-            "image": ("sample.jpg", f, "image/jpeg")
+            "image": (f"sample.{extension}", image, content_type)
         }
 
         data = {
@@ -14,59 +168,177 @@ def analyze_sample(user_id, age, gender, image_path):
             "gender": gender
         }
 
-        response = requests.post(
-            f"{BASE_URL}/analyze",
+        started = time.perf_counter()
+        response = self._request(
+            "POST",
+            "/analyze",
+            idempotency_key,
             data=data,
             files=files
         )
+        upload["request_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        self.last_upload = upload
 
-    if response.status_code != 201:
-        raise Exception(f"API Error: {response.status_code} - {response.text}")
+        if progress:
+            progress("Reading result...")
 
-    payload = response.json()
+        if response.status_code != 201:
+            raise Exception(f"API Error: {response.status_code} - {response.text}")
 
-    if not payload.get("success"):
-        raise Exception(payload.get("error", "Unknown API error"))
+        payload = response.json()
 
-    return {
-        "user_id": payload.get("user_id"),
-        "result_id": payload.get("result_id"),
-        "result_url": payload.get("result_url"),
-        "rbc": payload.get("rbc"),
-        "wbc": payload.get("wbc"),
-        "uti": payload.get("uti")
-    }
+        if not payload.get("success"):
+            raise Exception(payload.get("error", "Unknown API error"))
 
-def get_users():
-    response = requests.get(f"{BASE_URL}/users")
+        return {
+            "user_id": payload.get("user_id"),
+            "result_id": payload.get("result_id"),
+            "result_url": payload.get("result_url"),
+            "rbc": payload.get("rbc"),
+            "wbc": payload.get("wbc"),
+            "uti": payload.get("uti"),
+            "upload": upload
+        }
+
+    def get_users(self):
+        response = self._request("GET", "/users")
+
+        if response.status_code == 200:
+            return response.json()
+
+        raise Exception(f"API error: {response.status_code} {response.text}")
+
+    def get_users_if_changed(self, etag=None, last_modified=None, limit=None):
+        # Conditional GET /users, optionally of the first `limit` users only.
+        # Returns (users, total, etag, last_modified), with users None when
+        # the server answered 304 Not Modified; see _users_page for total.
+        # When the server sends its whole table, users is an iterator that
+        # parses the response as it downloads.
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        params = {"limit": limit, "offset": 0} if limit else None
+
+        response = self._request(
+            "GET",
+            "/users",
+            headers=headers,
+            params=params,
+            stream=True
+        )
+
+        if response.status_code == 304:
+            response.close()
+            return None, None, etag, last_modified
+
+        users, total = self._users_page(response, stream=True)
+        return (
+            users,
+            total,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified")
+        )
+
+    def get_users_page(self, limit, offset=0, q=None):
+        # One page of GET /users, optionally filtered server-side by a name
+        # query. Returns (users, total); see _users_page.
+        params = {"limit": limit, "offset": offset}
+        if q:
+            params["q"] = q
+
+        return self._users_page(self._request("GET", "/users", params=params))
+
+    def _users_page(self, response, stream=False):
+        # A server that pages answers {"users": [...], "total": N}. Older
+        # servers ignore the parameters and return the full table as a
+        # plain list, in which case total is None.
+        if response.status_code != 200:
+            raise Exception(f"API error: {response.status_code} {response.text}")
+
+        if stream:
+            users, payload = iter_json(response.iter_content(STREAM_CHUNK))
+            if users is not None:
+                return _closing(users, response), None
+        else:
+            payload = response.json()
+
+        if isinstance(payload, dict):
+            return payload.get("users", []), payload.get("total")
 
-    if response.status_code == 200:
-        return response.json()
+        return payload, None
 
-    raise Exception(f"API error: {response.status_code} {response.text}")
-    
+    def create_user(self, firstname, middlename, lastname, age, gender,
+                    idempotency_key=None):
+        payload = {
+            "firstname": firstname,
+            "middlename": middlename,
+            "lastname": lastname,
+            "age": age,
+            "gender": gender
+        }
+
+        response = self._request("POST", "/info", idempotency_key, json=payload)
+
+        if response.status_code == 201:
+            return response.json()
+
+        raise Exception(response.text)
+
+
+def _record_upload(upload):
+    # Request time is already in http_request_seconds{path="/analyze"}
+    UPLOAD_BYTES.observe(upload["bytes_out"])
+    UPLOAD_BYTES_IN.inc(upload["bytes_in"])
+    # A re-encode can come out larger; counters only go up
+    UPLOAD_BYTES_SAVED.inc(max(upload["bytes_saved"], 0))
+    PREPROCESS_TIME.observe(upload["preprocess_ms"] / 1000)
 
-def create_user(firstname, middlename, lastname, age, gender):
-    payload = {
-        "firstname": firstname,
-        "middlename": middlename,
-        "lastname": lastname,
-        "age": age,
-        "gender": gender
-    }
 
-    response = requests.post(f"{BASE_URL}/info", json=payload)
+def _request_error(method, path, reason):
+    metrics.counter(
+        "http_errors_total",
+        "Failed API requests by endpoint and status",
+        method=method,
+        path=path,
+        reason=reason
+    ).inc()
 
-    if response.status_code == 201:
-        return response.json()
 
-    raise Exception(response.text)
+def _closing(items, response):
+    # Releases the pooled connection however far the caller iterates
+    try:
+        yield from items
+    except (requests.ConnectionError, requests.Timeout,
+            requests.exceptions.ChunkedEncodingError) as e:
+        raise ServerUnreachable(f"Server unreachable: {e}") from e
+    finally:
+        response.close()
+
+
+client = ApiClient()
+
+
+def analyze_sample(user_id, age, gender, image, progress=None,
+                   idempotency_key=None):
+    return client.analyze_sample(
+        user_id, age, gender, image, progress, idempotency_key
+    )
+
+
+def get_users():
+    return client.get_users()
+
 
+def get_users_page(limit, offset=0, q=None):
+    return client.get_users_page(limit, offset, q)
 
-def fetch_users():
-    response = requests.get(f"{BASE_URL}/users")
 
-    if response.status_code == 200:
-        return response.json()
+def create_user(firstname, middlename, lastname, age, gender,
+                idempotency_key=None):
+    return client.create_user(
+        firstname, middlename, lastname, age, gender, idempotency_key
+    )
 
-    raise Exception(response.text)
\ No newline at end of file
@@ -0,0 +1,55 @@
+import os
+import queue
+import socket
+import threading
+import time
+
+# Directory for audit copies of analyzed samples; archiving is disabled
+# when unset. Files are written on a background thread so the SD card
+# never sits on the capture path.
+ARCHIVE_DIR = os.environ.get("PEESENSE_ARCHIVE_DIR")
+
+_queue = queue.Queue()
+_thread = None
+_lock = threading.Lock()
+_counter = 0
+
+
+def archive_sample(image, user_id=""):
+    global _thread, _counter
+
+    if not ARCHIVE_DIR:
+        return
+
+    with _lock:
+        _counter += 1
+        # Hostname and pid keep kiosks sharing a directory from colliding
+        name = "{}_{}_{}_{}_{}.jpg".format(
+            time.strftime("%Y%m%d-%H%M%S"),
+            socket.gethostname(),
+            os.getpid(),
+            _counter,
+            user_id or "unknown"
+        )
+
+        if _thread is None:
+            _thread = threading.Thread(target=_writer, daemon=True)
+            _thread.start()
+
+    _queue.put((os.path.join(ARCHIVE_DIR, name), bytes(image)))
+
+
+def _writer():
+    while True:
+        path, data = _queue.get()
+
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        except OSError as e:
+            print("Failed to archive sample:", e)
@@ -0,0 +1,309 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+from PySide6.QtCore import Qt, QThread, Signal
+from PySide6.QtGui import QImage
+
+from services import metrics
+from services.mjpeg import MjpegFrameParser
+
+READ_SIZE = 65536
+MAX_BUFFER = 4_000_000
+
+# Readiness: the stream counts as ready once this many frames have decoded
+# and the mean brightness of the last few frames has stopped moving
+# (auto-exposure settled) on a frame that is not blank.
+READY_MIN_FRAMES = 3
+EXPOSURE_TOLERANCE = 3.0
+MIN_CONTRAST = 4.0
+# Give up waiting for exposure to settle after this many frames
+READY_MAX_FRAMES = 40
+
+# Number of recent decoded frames kept for best-frame selection
+FOCUS_WINDOW = 8
+# Luma plane size used for exposure and focus metrics
+METRICS_WIDTH = 160
+METRICS_HEIGHT = 120
+
+FRAMES_PARSED = metrics.counter(
+    "camera_frames_parsed_total", "Frames split from the camera stream"
+)
+FRAMES_DECODED = metrics.counter(
+    "camera_frames_decoded_total", "Frames decoded for the preview"
+)
+# "read": older frames of a read, skipped for the newest one; "ui": decoded
+# frames replaced before the UI took them
+FRAMES_SKIPPED_READ = metrics.counter(
+    "camera_frames_dropped_total", "Frames never shown", stage="read"
+)
+FRAMES_SKIPPED_UI = metrics.counter(
+    "camera_frames_dropped_total", "Frames never shown", stage="ui"
+)
+PARSE_TIME = metrics.histogram(
+    "camera_parse_seconds", "Time to scan one read of the stream for frames"
+)
+DECODE_TIME = metrics.histogram(
+    "camera_decode_seconds", "JPEG decode and preview scaling per frame"
+)
+
+
+def frame_metrics(image):
+    # Returns (mean, stddev, sharpness) of a downscaled luma plane.
+    # Sharpness is the variance of the 4-neighbour Laplacian.
+    small = image.scaled(
+        METRICS_WIDTH,
+        METRICS_HEIGHT,
+        Qt.IgnoreAspectRatio,
+        Qt.FastTransformation
+    ).convertToFormat(QImage.Format_Grayscale8)
+
+    rows = np.frombuffer(small.constBits(), np.uint8)
+    rows = rows.reshape(METRICS_HEIGHT, small.bytesPerLine())
+    luma = rows[:, :METRICS_WIDTH].astype(np.float32)
+
+    laplacian = (
+        luma[1:-1, :-2] + luma[1:-1, 2:] +
+        luma[:-2, 1:-1] + luma[2:, 1:-1] -
+        4 * luma[1:-1, 1:-1]
+    )
+
+    return float(luma.mean()), float(luma.std()), float(laplacian.var())
+
+
+class CaptureWorker(QThread):
+    # Emitted once per "batch" of frames; the UI pulls the newest frame with
+    # take_frame(). While a notification is pending, newer frames simply
+    # replace the stored one, so stale frames are dropped instead of queued.
+    frame_ready = Signal()
+    ready = Signal()
+    failed = Signal(str)
+    still_ready = Signal(object)
+    still_failed = Signal(str)
+
+    def __init__(self, source, width, height, paused=False, parent=None):
+        super().__init__(parent)
+        # A services.camera_source.CameraSource
+        self.source = source
+        self.width = width
+        self.height = height
+
+        self.paused = paused
+
+        self._still_requested = False
+        self.capturing_still = False
+
+        self._lock = threading.Lock()
+        self._latest = None
+        self._pending = False
+        self._stopping = False
+
+        self.is_ready = False
+        self._decoded = 0
+        self._brightness = []
+
+        # (sharpness, jpeg) for the last FOCUS_WINDOW decoded frames
+        self._recent = deque(maxlen=FOCUS_WINDOW)
+
+        # Read by the UI watchdog to detect a stalled stream
+        self.last_frame_at = time.monotonic()
+
+    # ==========================================================
+    # THREAD
+    # ==========================================================
+
+    def run(self):
+        while True:
+            started = self._stream()
+
+            with self._lock:
+                still_requested = self._still_requested
+                self._still_requested = False
+
+            if self._stopping or not started:
+                return
+
+            if not still_requested:
+                self.failed.emit("Camera stream ended unexpectedly.")
+                return
+
+            # The stream was stopped to free the sensor for a still;
+            # take it, then carry on previewing.
+            self._capture_still()
+
+            if self._stopping:
+                return
+
+    def _stream(self):
+        self.last_frame_at = time.monotonic()
+
+        source = self.source
+        try:
+            source.start(self.paused)
+        except OSError as e:
+            self.failed.emit(f"Failed to start camera: {e}")
+            return False
+
+        with self._lock:
+            # request_still(), pause() or resume() may have been called
+            # before the stream was running
+            if self._still_requested:
+                source.interrupt()
+            elif source.pausable and source.paused != self.paused:
+                source.set_paused(self.paused)
+
+        parser = MjpegFrameParser(MAX_BUFFER, READ_SIZE)
+
+        while not self._stopping:
+            # Read straight into the parser's buffer — no per-chunk copies
+            n = source.readinto(parser.writable()[:READ_SIZE])
+            if not n:
+                break
+
+            started = time.perf_counter()
+            frames = parser.commit(n)
+            PARSE_TIME.observe(time.perf_counter() - started)
+
+            # Only the newest frame of each read is worth decoding; sources
+            # that cannot pause keep streaming, and those frames are dropped
+            if frames and not self.paused:
+                FRAMES_PARSED.inc(len(frames))
+                FRAMES_SKIPPED_READ.inc(len(frames) - 1)
+                self._decode(bytes(frames[-1]))
+
+        source.release()
+        return True
+
+    def _capture_still(self):
+        try:
+            data = self.source.capture_still()
+        except OSError as e:
+            self.capturing_still = False
+            self.still_failed.emit(f"Failed to capture still: {e}")
+            return
+
+        self.capturing_still = False
+        self.last_frame_at = time.monotonic()
+
+        if self._stopping:
+            return
+
+        if data is None:
+            # No separate still mode; the sharpest preview frame is used
+            data = self.best_frame() or b""
+
+        if data.startswith(b'\xff\xd8'):
+            self.still_ready.emit(data)
+        else:
+            self.still_failed.emit("Failed to capture still image.")
+
+    def _decode(self, frame):
+        started = time.perf_counter()
+        image = QImage.fromData(frame)
+        if image.isNull():
+            return
+
+        image = image.scaled(
+            self.width,
+            self.height,
+            Qt.KeepAspectRatio,
+            Qt.FastTransformation
+        )
+        DECODE_TIME.observe(time.perf_counter() - started)
+        FRAMES_DECODED.inc()
+
+        self.last_frame_at = time.monotonic()
+        mean, stddev, sharpness = frame_metrics(image)
+
+        with self._lock:
+            self._latest = (frame, image, sharpness)
+            self._recent.append((sharpness, frame))
+            notify = not self._pending
+            self._pending = True
+
+        if notify:
+            self.frame_ready.emit()
+        else:
+            FRAMES_SKIPPED_UI.inc()
+
+        if not self.is_ready and self._settled(mean, stddev):
+            self.is_ready = True
+            self.ready.emit()
+
+    def _settled(self, mean, stddev):
+        self._decoded += 1
+        if self._decoded >= READY_MAX_FRAMES:
+            return True
+
+        self._brightness = self._brightness[-(READY_MIN_FRAMES - 1):] + [mean]
+
+        if self._decoded < READY_MIN_FRAMES or stddev < MIN_CONTRAST:
+            return False
+
+        return max(self._brightness) - min(self._brightness) <= EXPOSURE_TOLERANCE
+
+    # ==========================================================
+    # UI SIDE
+    # ==========================================================
+
+    def take_frame(self):
+        with self._lock:
+            latest = self._latest
+            self._pending = False
+        return latest
+
+    def best_frame(self):
+        # Sharpest of the recent frames, so a frame caught mid-motion is
+        # not what gets analyzed
+        with self._lock:
+            if not self._recent:
+                return None
+            return max(self._recent, key=lambda entry: entry[0])[1]
+
+    def pause(self):
+        self._toggle_encoding(True)
+
+    def resume(self):
+        self._toggle_encoding(False)
+
+    def _toggle_encoding(self, paused):
+        with self._lock:
+            if self.paused == paused:
+                return
+
+            if self.source.pausable:
+                self.source.set_paused(paused)
+
+            self.paused = paused
+            self.last_frame_at = time.monotonic()
+
+            # Frames from before the pause are stale by definition
+            self._latest = None
+            self._pending = False
+            self._recent.clear()
+
+    def request_still(self):
+        # Stopping the stream makes _stream() return, after which run()
+        # picks up the pending still request.
+        with self._lock:
+            if self._still_requested or self.capturing_still:
+                return
+
+            self._still_requested = True
+            self.capturing_still = True
+            self.source.interrupt()
+
+    def stop(self):
+        with self._lock:
+            self._stopping = True
+
+        self.source.close()
+        self.wait(3000)
+
+        # A stopped worker may outlive the screen's reference for a while;
+        # it should not pin a preview image and a handful of JPEGs
+        with self._lock:
+            self._latest = None
+            self._pending = False
+            self._recent.clear()
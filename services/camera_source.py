@@ -0,0 +1,411 @@
+import os
+import signal
+import subprocess
+import threading
+import time
+
+from services.mjpeg import MjpegFrameParser
+
+# Which camera feeds the upload screen:
+#   "rpicam"              Raspberry Pi camera through rpicam-vid/rpicam-still
+#   "v4l2[:DEVICE]"       any V4L2 device (default /dev/video0) through ffmpeg
+#   "replay:PATH"         a recorded MJPEG file, played back at REPLAY_FPS
+#   "none"                no camera; the preview stays blank
+CAMERA = os.environ.get("PEESENSE_CAMERA", "rpicam")
+
+FRAMERATE = 20
+# Playback rate of replay sources; 0 streams the file as fast as it is read
+REPLAY_FPS = float(os.environ.get("PEESENSE_REPLAY_FPS", FRAMERATE))
+# JPEG a replay source returns as its still; unset uses the current frame
+REPLAY_STILL = os.environ.get("PEESENSE_REPLAY_STILL")
+
+# Short preview phase before a still so exposure and white balance converge
+STILL_SETTLE_MS = 700
+STILL_TIMEOUT = 15
+
+V4L2_DEVICE = "/dev/video0"
+# Pixel format requested from V4L2 devices. "mjpeg" is passed through
+# untouched; anything else (e.g. "yuyv422") is encoded by ffmpeg.
+V4L2_INPUT_FORMAT = "mjpeg"
+
+
+class CameraSource:
+    # A stream of MJPEG bytes for CaptureWorker.
+    #
+    # start() and readinto() run on the capture thread. interrupt() and
+    # close() may be called from any thread and must make a blocked
+    # readinto() return 0. A source that is not pausable keeps streaming
+    # while the worker is paused, and the worker discards those frames.
+    pausable = False
+
+    def __init__(self):
+        self.paused = False
+
+    def start(self, paused=False):
+        # Raises OSError when the camera cannot be started
+        raise NotImplementedError
+
+    def readinto(self, buffer):
+        # Returns the number of bytes read, 0 at end of stream
+        raise NotImplementedError
+
+    def release(self):
+        # Called on the capture thread once the stream has ended
+        pass
+
+    def interrupt(self):
+        # Ends the current stream or still capture
+        raise NotImplementedError
+
+    def close(self):
+        # Like interrupt(), and refuses to start again afterwards
+        raise NotImplementedError
+
+    def set_paused(self, paused):
+        self.paused = paused
+
+    def capture_still(self):
+        # A full-resolution JPEG, taken while the stream is stopped. None
+        # means the source has no separate still mode, b"" that it failed.
+        return None
+
+
+# ==========================================================
+# EXTERNAL PROCESSES
+# ==========================================================
+
+class SubprocessSource(CameraSource):
+    # A camera driven by a command that writes MJPEG to stdout
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._process = None
+        self._closed = False
+
+    def stream_command(self, paused):
+        raise NotImplementedError
+
+    def still_command(self):
+        return None
+
+    def start(self, paused=False):
+        self.paused = paused
+        self._spawn(self.stream_command(paused), bufsize=0)
+
+    def _spawn(self, cmd, **kwargs):
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            **kwargs
+        )
+
+        with self._lock:
+            self._process = process
+
+            # close() may have been called before the process existed
+            if self._closed:
+                process.kill()
+
+        return process
+
+    def readinto(self, buffer):
+        try:
+            return self._process.stdout.readinto(buffer)
+        except (OSError, ValueError):
+            return 0
+
+    def release(self):
+        process = self._process
+        if process is None:
+            return
+
+        if process.poll() is None:
+            process.kill()
+
+        process.stdout.close()
+        process.wait()
+        self._process = None
+
+    def interrupt(self):
+        with self._lock:
+            process = self._process
+            if process is not None and process.poll() is None:
+                process.kill()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        self.interrupt()
+
+    def capture_still(self):
+        cmd = self.still_command()
+        if cmd is None:
+            return None
+
+        process = self._spawn(cmd)
+
+        try:
+            data, _ = process.communicate(timeout=STILL_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            data = b""
+
+        self._process = None
+        return data if process.returncode == 0 else b""
+
+
+class RpicamSource(SubprocessSource):
+    def __init__(self, preview, still, standby=False):
+        # preview and still are (width, height, quality). With standby,
+        # rpicam-vid runs with --signal so SIGUSR1 pauses encoding while
+        # the camera itself keeps running.
+        super().__init__()
+        self.preview = preview
+        self.still = still
+        self.pausable = standby
+
+    def stream_command(self, paused):
+        width, height, quality = self.preview
+
+        cmd = [
+            "rpicam-vid",
+            "-t", "0",
+            "--codec", "mjpeg",
+            "--width", str(width),
+            "--height", str(height),
+            "--framerate", str(FRAMERATE),
+            "--quality", str(quality),  # Lower quality = less data = smoother stream
+            "--inline",
+            "--nopreview",
+            "-o", "-"
+        ]
+
+        if self.pausable:
+            cmd[-2:-2] = [
+                "--signal",
+                "--initial", "pause" if paused else "record"
+            ]
+
+        return cmd
+
+    def still_command(self):
+        width, height, quality = self.still
+
+        return [
+            "rpicam-still",
+            "--timeout", str(STILL_SETTLE_MS),
+            "--width", str(width),
+            "--height", str(height),
+            "--quality", str(quality),
+            "--encoding", "jpg",
+            "--nopreview",
+            "-o", "-"
+        ]
+
+    def set_paused(self, paused):
+        with self._lock:
+            if self.paused == paused:
+                return
+
+            process = self._process
+            if process is not None and process.poll() is None:
+                process.send_signal(signal.SIGUSR1)
+
+            self.paused = paused
+
+
+class V4l2Source(SubprocessSource):
+    # USB and other V4L2 cameras, read through ffmpeg
+
+    def __init__(self, preview, still, device=V4L2_DEVICE,
+                 input_format=V4L2_INPUT_FORMAT):
+        super().__init__()
+        self.preview = preview
+        self.still = still
+        self.device = device
+        self.input_format = input_format
+
+    def _command(self, width, height, quality, output):
+        cmd = [
+            "ffmpeg",
+            "-hide_banner",
+            "-loglevel", "error",
+            "-f", "v4l2",
+            "-input_format", self.input_format,
+            "-video_size", f"{width}x{height}",
+            "-framerate", str(FRAMERATE),
+            "-i", self.device,
+        ]
+
+        if self.input_format == "mjpeg":
+            cmd += ["-c:v", "copy"]
+        else:
+            cmd += ["-c:v", "mjpeg", "-q:v", str(qscale(quality))]
+
+        return cmd + output + ["-f", "mjpeg", "-"]
+
+    def stream_command(self, paused):
+        return self._command(*self.preview, [])
+
+    def still_command(self):
+        # Frames from the settle period are read and discarded
+        return self._command(
+            *self.still,
+            ["-ss", str(STILL_SETTLE_MS / 1000), "-frames:v", "1"]
+        )
+
+
+def qscale(quality):
+    # JPEG quality 1-100 to ffmpeg's mjpeg qscale, 31 (worst) to 2 (best)
+    return round(31 - (min(max(quality, 1), 100) - 1) * 29 / 99)
+
+
+# ==========================================================
+# REPLAY
+# ==========================================================
+
+class ReplaySource(CameraSource):
+    # Plays back a recorded MJPEG file (e.g. `rpicam-vid --codec mjpeg -o
+    # sample.mjpeg`) one frame per 1/fps seconds, looping at the end. It
+    # needs no camera, so the capture pipeline runs the same on any
+    # machine and sees the same frames on every run.
+    pausable = True
+
+    def __init__(self, path, fps=REPLAY_FPS, loop=True, still_path=None):
+        super().__init__()
+        self.path = path
+        self.fps = fps
+        self.loop = loop
+        self.still_path = still_path
+
+        self.frames = None
+        self.index = 0
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._interrupted = False
+        self._closed = False
+        self._pending = None
+        self._due = None
+
+    def _load(self):
+        # Split once, on the capture thread; frames are kept for restarts
+        with open(self.path, "rb") as f:
+            data = f.read()
+
+        frames = MjpegFrameParser(max(len(data), 1)).feed(data)
+        self.frames = [bytes(frame) for frame in frames]
+        if not self.frames:
+            raise OSError(f"No JPEG frames in {self.path}")
+
+    def start(self, paused=False):
+        if self.frames is None:
+            self._load()
+
+        with self._lock:
+            self._interrupted = self._closed
+            self.paused = paused
+            self._pending = None
+            self._due = None
+
+    def readinto(self, buffer):
+        if not self._pending:
+            frame = self._next_frame()
+            if frame is None:
+                return 0
+            self._pending = memoryview(frame)
+
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+    def _next_frame(self):
+        # Blocks until the next frame is due, the source is resumed or it
+        # is interrupted. Flags are re-read on every pass, so a wake-up
+        # lost between wait() and clear() costs nothing.
+        while True:
+            with self._lock:
+                if self._interrupted:
+                    return None
+                paused = self.paused
+
+            if paused:
+                self._due = None
+                self._wake.wait()
+                self._wake.clear()
+                continue
+
+            now = time.monotonic()
+            if self._due is None:
+                self._due = now
+
+            delay = self._due - now
+            if delay > 0:
+                self._wake.wait(delay)
+                self._wake.clear()
+                continue
+
+            break
+
+        if self.index >= len(self.frames):
+            if not self.loop:
+                return None
+            self.index = 0
+
+        frame = self.frames[self.index]
+        self.index += 1
+
+        if self.fps > 0:
+            # Late frames are not made up for, like a live camera
+            self._due = max(self._due + 1 / self.fps, time.monotonic())
+
+        return frame
+
+    def interrupt(self):
+        with self._lock:
+            self._interrupted = True
+        self._wake.set()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        self.interrupt()
+
+    def set_paused(self, paused):
+        with self._lock:
+            self.paused = paused
+        self._wake.set()
+
+    def capture_still(self):
+        if self.still_path:
+            with open(self.still_path, "rb") as f:
+                return f.read()
+
+        # The recording is the best resolution available
+        return self.frames[self.index % len(self.frames)]
+
+
+# ==========================================================
+# FACTORY
+# ==========================================================
+
+def open_camera(preview, still, standby=False, spec=None):
+    # Builds the source named by spec (default CAMERA), or None when the
+    # kiosk runs without a camera. preview and still are (width, height,
+    # quality); replay sources ignore them.
+    kind, _, arg = (spec or CAMERA).partition(":")
+
+    if kind == "rpicam":
+        return RpicamSource(preview, still, standby)
+    if kind == "v4l2":
+        return V4l2Source(preview, still, arg or V4L2_DEVICE)
+    if kind == "replay":
+        return ReplaySource(arg, still_path=REPLAY_STILL)
+    if kind == "none":
+        return None
+
+    raise ValueError(f"Unknown camera source: {spec or CAMERA}")
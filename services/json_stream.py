@@ -0,0 +1,81 @@
+import codecs
+import json
+
+# Consumed text is dropped from the buffer once this much has piled up
+COMPACT_AT = 65536
+
+_WHITESPACE = " \t\r\n"
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def iter_json(chunks):
+    # Incremental reader for a JSON document arriving as byte chunks.
+    # Returns (items, None) when the document is a top-level array, where
+    # items yields each element as soon as it has been received in full;
+    # otherwise reads the rest and returns (None, value).
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    text = ""
+
+    for chunk in chunks:
+        text += decoder.decode(chunk)
+        if text.lstrip(_WHITESPACE):
+            break
+
+    text = text.lstrip(_WHITESPACE)
+
+    if not text.startswith("["):
+        for chunk in chunks:
+            text += decoder.decode(chunk)
+        text += decoder.decode(b"", final=True)
+        return None, json.loads(text)
+
+    return _iter_array(text, chunks, decoder), None
+
+
+def _iter_array(text, chunks, decoder):
+    parser = json.JSONDecoder()
+    pos = 1
+    done = False
+
+    while True:
+        # Skip to the next element
+        while pos < len(text) and text[pos] in _WHITESPACE + ",":
+            pos += 1
+
+        if pos < len(text) and text[pos] == "]":
+            return
+
+        if pos < len(text):
+            try:
+                item, end = parser.raw_decode(text, pos)
+            except json.JSONDecodeError:
+                if done:
+                    raise
+            else:
+                # A number or literal cut off by the chunk boundary would
+                # still decode ("12" of "123", "2" of "2.5" or "2e3"); wait
+                # until something that cannot continue it follows
+                if done or (end < len(text) and not (
+                    _is_number(item) and text[end] in ".eE"
+                )):
+                    yield item
+                    pos = end
+                    continue
+
+        elif done:
+            raise json.JSONDecodeError("Unterminated array", text, pos)
+
+        if pos >= COMPACT_AT:
+            text = text[pos:]
+            pos = 0
+
+        chunk = next(chunks, None)
+        if chunk is None:
+            text += decoder.decode(b"", final=True)
+            done = True
+        else:
+            text += decoder.decode(chunk)
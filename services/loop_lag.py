@@ -0,0 +1,220 @@
+import atexit
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+from PySide6.QtCore import QObject, Qt, QTimer
+
+from services import metrics
+
+# The GUI thread runs a timer every LAG_INTERVAL_MS; how late it fires is
+# how long taps and repaints were kept waiting at that moment.
+LAG_INTERVAL_MS = 100
+
+# A watchdog thread checks the timer every WATCHDOG_POLL_MS. Once it is
+# more than STALL_THRESHOLD_MS late, the GUI thread's Python stack is
+# sampled on every check until the loop runs again, and the stall is
+# logged with the stack seen most often.
+STALL_THRESHOLD_MS = int(os.environ.get("PEESENSE_STALL_MS", 250))
+WATCHDOG_POLL_MS = 50
+# Frames kept per sampled stack, innermost first
+STACK_DEPTH = 48
+# Stalls kept for the diagnostics overlay
+RECENT_STALLS = 20
+
+# With a file set, the GUI thread is also sampled on every check while it
+# runs normally, and the samples are written there every PROFILE_INTERVAL
+# seconds in collapsed-stack format (flamegraph.pl, speedscope).
+PROFILE_FILE = os.environ.get("PEESENSE_PROFILE_FILE")
+PROFILE_INTERVAL = 60
+
+LAG = metrics.histogram(
+    "event_loop_lag_seconds",
+    "How late the GUI thread ran a timer due every LAG_INTERVAL_MS"
+)
+STALLS = metrics.histogram(
+    "event_loop_stall_seconds",
+    "Time the GUI thread ran no events, for stalls over STALL_THRESHOLD_MS"
+)
+
+
+class LagProbe(QObject):
+    def __init__(self, interval_ms=LAG_INTERVAL_MS, parent=None):
+        super().__init__(parent)
+        self.interval = interval_ms / 1000
+        self._last = None
+        # Last tick on the monotonic clock, read by the watchdog thread
+        self.heartbeat = time.monotonic()
+
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self._tick)
+
+    def start(self):
+        self._last = time.perf_counter()
+        self.heartbeat = time.monotonic()
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+
+    def _tick(self):
+        now = time.perf_counter()
+        LAG.observe(max(0.0, now - self._last - self.interval))
+        self._last = now
+        self.heartbeat = time.monotonic()
+
+
+_probe = None
+
+
+def start_lag_probe():
+    global _probe
+
+    if _probe is None:
+        _probe = LagProbe()
+        _probe.start()
+
+    return _probe
+
+
+# ==========================================================
+# STALL WATCHDOG
+# ==========================================================
+
+class Stall:
+    def __init__(self, since):
+        # Heartbeat the loop stopped after
+        self.since = since
+        self.duration = None
+        self.samples = Counter()
+
+    def top(self):
+        # The stack seen most often, and in how many samples
+        return self.samples.most_common(1)[0]
+
+
+class StallWatchdog(threading.Thread):
+    # Only reads the probe's heartbeat and the interpreter's frames, so it
+    # works while the GUI thread is stuck in Python or in a blocking call.
+    # Between stalls a check is one clock read, cheap enough to leave on.
+
+    def __init__(self, probe, threshold_ms=STALL_THRESHOLD_MS,
+                 poll_ms=WATCHDOG_POLL_MS, profile_file=PROFILE_FILE):
+        super().__init__(name="stall-watchdog", daemon=True)
+        self.probe = probe
+        self.threshold = threshold_ms / 1000
+        self.poll = poll_ms / 1000
+        self.profile_file = profile_file
+
+        self.stalls = deque(maxlen=RECENT_STALLS)
+        self.profile = Counter()
+
+        self._target = threading.main_thread().ident
+        self._stall = None
+        self._stopped = threading.Event()
+
+    def stop(self):
+        self._stopped.set()
+
+    def run(self):
+        next_write = time.monotonic() + PROFILE_INTERVAL
+
+        while not self._stopped.wait(self.poll):
+            heartbeat = self.probe.heartbeat
+            now = time.monotonic()
+            stalled = now - heartbeat - self.probe.interval > self.threshold
+
+            if stalled or self.profile_file:
+                stack = self.sample()
+                if self.profile_file and stack:
+                    self.profile[stack] += 1
+
+            if stalled:
+                if self._stall is None:
+                    self._stall = Stall(heartbeat)
+                if stack:
+                    self._stall.samples[stack] += 1
+
+            elif self._stall is not None:
+                self._finish(heartbeat)
+
+            if self.profile_file and now >= next_write:
+                self.write_profile()
+                next_write = now + PROFILE_INTERVAL
+
+    def sample(self):
+        # (file, line, function) frames of the GUI thread, outermost first
+        frame = sys._current_frames().get(self._target)
+        stack = []
+
+        while frame is not None and len(stack) < STACK_DEPTH:
+            code = frame.f_code
+            stack.append((code.co_filename, frame.f_lineno, code.co_name))
+            frame = frame.f_back
+
+        return tuple(reversed(stack))
+
+    def _finish(self, heartbeat):
+        stall, self._stall = self._stall, None
+        stall.duration = heartbeat - stall.since - self.probe.interval
+
+        # The overlay reads the deque once the histogram shows a stall
+        self.stalls.append(stall)
+        STALLS.observe(stall.duration)
+
+        if not stall.samples:
+            print(f"Event loop stalled for {stall.duration * 1000:.0f} ms")
+            return
+
+        stack, hits = stall.top()
+        print(
+            f"Event loop stalled for {stall.duration * 1000:.0f} ms; "
+            f"GUI thread in ({hits}/{sum(stall.samples.values())} samples):"
+        )
+        for filename, line, function in stack[-8:]:
+            print(f"    {filename}:{line} in {function}")
+
+    def write_profile(self):
+        # One "outer;...;inner count" line per distinct stack, without line
+        # numbers so samples from anywhere in a function add up
+        folded = Counter()
+        for stack, count in list(self.profile.items()):
+            key = ";".join(
+                f"{os.path.basename(filename)}:{function}"
+                for filename, _, function in stack
+            )
+            folded[key] += count
+
+        try:
+            tmp_path = self.profile_file + ".tmp"
+            with open(tmp_path, "w") as f:
+                for key, count in folded.most_common():
+                    f.write(f"{key} {count}\n")
+            os.replace(tmp_path, self.profile_file)
+
+        except OSError as e:
+            print("Failed to write profile:", e)
+
+
+_watchdog = None
+
+
+def start_stall_watchdog():
+    global _watchdog
+
+    if _watchdog is None:
+        _watchdog = StallWatchdog(start_lag_probe())
+        _watchdog.start()
+
+        if _watchdog.profile_file:
+            atexit.register(_watchdog.write_profile)
+
+    return _watchdog
+
+
+def get_stall_watchdog():
+    return _watchdog
@@ -0,0 +1,268 @@
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# In-process counters, gauges and histograms for the hot paths (camera,
+# HTTP, screen changes, event loop). Updating a metric takes one lock and
+# a few additions, so it is cheap enough for per-frame use; cache the
+# metric object at module level instead of looking it up every time.
+
+# File the metrics are written to every EXPORT_INTERVAL seconds. A ".prom"
+# file is rewritten in Prometheus text format (for node_exporter's
+# textfile collector); any other name gets one JSON snapshot appended per
+# interval. Unset disables export.
+EXPORT_PATH = os.environ.get("PEESENSE_METRICS_FILE")
+EXPORT_INTERVAL = 15
+
+# Recent observations kept per histogram for live percentiles
+WINDOW = 512
+
+# Upper bounds, in seconds
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1, 2.5, 5, 10, 30, 60
+)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._lock = threading.Lock()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, help, labels):
+        super().__init__(name, help, labels)
+        self.value = 0
+
+    def inc(self, n=1):
+        with self._lock:
+            self.value += n
+
+    def snapshot(self):
+        return {"value": self.value}
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help, labels):
+        super().__init__(name, help, labels)
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def snapshot(self):
+        return {"value": self.value}
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels, buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=WINDOW)
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+            self.recent.append(value)
+
+    def time(self):
+        return _Timer(self)
+
+    def percentile(self, p):
+        # Over the last WINDOW observations; None before the first
+        with self._lock:
+            values = sorted(self.recent)
+        if not values:
+            return None
+        return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+    def max(self):
+        with self._lock:
+            return max(self.recent, default=None)
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max(),
+        }
+
+
+class _Timer:
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+
+
+# ==========================================================
+# REGISTRY
+# ==========================================================
+
+_metrics = {}
+_lock = threading.Lock()
+
+
+def _get(cls, name, help, labels, **kwargs):
+    key = (name, tuple(sorted(labels.items())))
+    metric = _metrics.get(key)
+
+    if metric is None:
+        with _lock:
+            metric = _metrics.get(key)
+            if metric is None:
+                metric = cls(name, help, dict(key[1]), **kwargs)
+                _metrics[key] = metric
+
+    return metric
+
+
+def counter(name, help="", **labels):
+    return _get(Counter, name, help, labels)
+
+
+def gauge(name, help="", **labels):
+    return _get(Gauge, name, help, labels)
+
+
+def histogram(name, help="", buckets=LATENCY_BUCKETS, **labels):
+    return _get(Histogram, name, help, labels, buckets=buckets)
+
+
+def find(name, **labels):
+    # An existing metric, or None; unlike counter() etc. never creates one
+    return _metrics.get((name, tuple(sorted(labels.items()))))
+
+
+def collect(name):
+    # Every metric called name, one per label set
+    with _lock:
+        return [m for (n, _), m in _metrics.items() if n == name]
+
+
+# ==========================================================
+# EXPORT
+# ==========================================================
+
+def snapshot():
+    with _lock:
+        metrics = list(_metrics.values())
+
+    return [
+        {"name": m.name, "type": m.kind, "labels": m.labels, **m.snapshot()}
+        for m in metrics
+    ]
+
+
+def prometheus_text():
+    with _lock:
+        metrics = sorted(_metrics.values(), key=lambda m: m.name)
+
+    lines = []
+    seen = set()
+
+    for m in metrics:
+        if m.name not in seen:
+            seen.add(m.name)
+            if m.help:
+                lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+
+        if m.kind != "histogram":
+            lines.append(f"{m.name}{_labels(m.labels)} {m.value}")
+            continue
+
+        with m._lock:
+            counts = list(m.counts)
+            total, count = m.sum, m.count
+
+        cumulative = 0
+        for bound, n in zip(m.buckets + (float("inf"),), counts):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"{m.name}_bucket{_labels({**m.labels, 'le': le})} {cumulative}")
+        lines.append(f"{m.name}_sum{_labels(m.labels)} {total}")
+        lines.append(f"{m.name}_count{_labels(m.labels)} {count}")
+
+    return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+        for k, v in labels.items()
+    )
+    return "{" + body + "}"
+
+
+def export(path=None):
+    path = path or EXPORT_PATH
+    if not path:
+        return
+
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        if path.endswith(".prom"):
+            # Scrapers must never see a half-written file
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w") as f:
+                f.write(prometheus_text())
+            os.replace(tmp_path, path)
+        else:
+            with open(path, "a") as f:
+                f.write(json.dumps({"ts": time.time(), "metrics": snapshot()}) + "\n")
+
+    except OSError as e:
+        print("Failed to export metrics:", e)
+
+
+_exporter = None
+
+
+def start_export(path=None, interval=EXPORT_INTERVAL):
+    global _exporter
+
+    path = path or EXPORT_PATH
+    if not path or _exporter is not None:
+        return
+
+    def run():
+        while True:
+            time.sleep(interval)
+            export(path)
+
+    _exporter = threading.Thread(target=run, daemon=True)
+    _exporter.start()
+    atexit.register(export, path)
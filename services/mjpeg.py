@@ -0,0 +1,188 @@
+SOI = b'\xff\xd8'
+
+# Parser states
+_SEEK = 0       # looking for the SOI of the next frame
+_MARKER = 1     # positioned on a marker inside a frame header
+_ENTROPY = 2    # inside entropy-coded scan data, looking for the next marker
+
+_SOS = 0xDA
+_EOI = 0xD9
+
+
+class MjpegFrameParser:
+    """Incremental MJPEG splitter over a fixed-size buffer.
+
+    Frames are returned as memoryviews into the internal buffer; they stay
+    valid until the next call to writable(), commit() or feed(). Copy a
+    frame with bytes() if it has to outlive that.
+    """
+
+    def __init__(self, capacity=4_000_000, min_free=65536):
+        self.capacity = capacity
+        self.min_free = min_free
+
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+
+        self.frames = 0
+        self.dropped_bytes = 0
+        self.bytes_copied = 0
+
+        self.reset()
+
+    def reset(self):
+        self._start = 0         # first byte still needed
+        self._end = 0           # end of valid data
+        self._pos = 0           # scan position, kept between calls
+        self._frame_start = 0
+        self._state = _SEEK
+
+    # ==========================================================
+    # INPUT
+    # ==========================================================
+
+    def writable(self):
+        # Free space at the tail of the buffer, for readinto()-style reads.
+        if self.capacity - self._end < self.min_free:
+            self._compact()
+
+        if self._end == self.capacity:
+            # A single frame filled the whole buffer — drop it and resync
+            self.dropped_bytes += self._end - self._start
+            self.reset()
+
+        return self._view[self._end:]
+
+    def commit(self, n):
+        self._end += n
+        return self._scan()
+
+    def feed(self, data):
+        data = memoryview(data)
+        frames = []
+
+        while data:
+            target = self.writable()
+            n = min(len(target), len(data))
+            target[:n] = data[:n]
+            self.bytes_copied += n
+            data = data[n:]
+
+            # Frames handed out by commit() would be clobbered by the next
+            # compaction, so materialize them when the chunk spans calls.
+            found = self.commit(n)
+            if data:
+                found = [bytes(f) for f in found]
+            frames.extend(found)
+
+        return frames
+
+    def _compact(self):
+        start = self._start
+        if start == 0:
+            return
+
+        length = self._end - start
+        self._view[:length] = self._view[start:self._end]
+        self.bytes_copied += length
+
+        self._start = 0
+        self._end = length
+        self._pos -= start
+        self._frame_start -= start
+
+    # ==========================================================
+    # SCANNER
+    # ==========================================================
+
+    def _scan(self):
+        buf = self._buf
+        end = self._end
+        pos = self._pos
+        state = self._state
+        frames = []
+
+        while True:
+            if state == _SEEK:
+                soi = buf.find(SOI, pos, end)
+                if soi == -1:
+                    # Nothing useful buffered; keep a trailing 0xFF in case
+                    # it is the first half of an SOI.
+                    keep = end - 1 if end > pos and buf[end - 1] == 0xFF else end
+                    self.dropped_bytes += keep - self._start
+                    self._start = keep
+                    pos = keep
+                    break
+
+                self.dropped_bytes += soi - self._start
+                self._start = soi
+                self._frame_start = soi
+                pos = soi + 2
+                state = _MARKER
+
+            elif state == _MARKER:
+                if pos + 2 > end:
+                    break
+
+                if buf[pos] != 0xFF:
+                    # Corrupt header — discard this frame and resync
+                    state = _SEEK
+                    continue
+
+                marker = buf[pos + 1]
+
+                if marker == 0xFF:
+                    # Fill byte before a marker
+                    pos += 1
+                elif marker == _EOI:
+                    pos += 2
+                    frames.append(self._view[self._frame_start:pos])
+                    self.frames += 1
+                    self._start = pos
+                    state = _SEEK
+                elif marker == 0xD8:
+                    # Truncated frame followed by a fresh SOI
+                    self.dropped_bytes += pos - self._frame_start
+                    self._start = pos
+                    self._frame_start = pos
+                    pos += 2
+                elif 0xD0 <= marker <= 0xD7 or marker == 0x01:
+                    # Standalone markers carry no length field
+                    pos += 2
+                else:
+                    if pos + 4 > end:
+                        break
+
+                    length = (buf[pos + 2] << 8) | buf[pos + 3]
+                    if length < 2:
+                        state = _SEEK
+                        continue
+
+                    # Segment payloads (EXIF thumbnails included) are
+                    # skipped by length, never scanned for markers.
+                    pos += 2 + length
+                    if marker == _SOS:
+                        state = _ENTROPY
+
+            else:
+                if pos >= end:
+                    break
+
+                ff = buf.find(b'\xff', pos, end)
+                if ff == -1 or ff + 1 >= end:
+                    pos = end if ff == -1 else ff
+                    break
+
+                nxt = buf[ff + 1]
+                if nxt == 0x00 or 0xD0 <= nxt <= 0xD7:
+                    # Byte stuffing and restart markers belong to the scan
+                    pos = ff + 2
+                elif nxt == 0xFF:
+                    pos = ff + 1
+                else:
+                    pos = ff
+                    state = _MARKER
+
+        self._pos = pos
+        self._state = state
+        return frames
@@ -0,0 +1,241 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+from PySide6.QtCore import QObject, Signal
+
+from services import api
+from services.storage import data_path
+
+# Jobs drained per wake-up; they share the client's pooled connection
+BATCH_SIZE = 10
+# Backoff while the server is unreachable: RETRY_BASE, doubling up to RETRY_MAX
+RETRY_BASE = 5
+RETRY_MAX = 300
+# Delivered jobs are kept this long so late result lookups still work
+KEEP_DONE_SECONDS = 7 * 24 * 3600
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        key TEXT UNIQUE NOT NULL,
+        kind TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        image BLOB,
+        depends_on TEXT,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        result TEXT,
+        error TEXT,
+        created REAL NOT NULL,
+        updated REAL NOT NULL
+    )
+"""
+
+
+def new_key():
+    return uuid.uuid4().hex
+
+
+class Outbox(QObject):
+    # Durable store-and-forward queue for create_user and analyze_sample
+    # submissions made while the server was unreachable. Each job keeps the
+    # idempotency key of the original attempt, so a retry of a request the
+    # server did receive cannot create a duplicate.
+    delivered = Signal(str, object)
+    failed = Signal(str, str)
+
+    def __init__(self, path=None):
+        super().__init__()
+        self.path = path or data_path("outbox.db")
+
+        self._db = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            isolation_level=None
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(SCHEMA)
+        self._db_lock = threading.Lock()
+
+        self._wake = threading.Event()
+        self._thread = None
+        self._failures = 0
+
+    # ==========================================================
+    # PRODUCER SIDE
+    # ==========================================================
+
+    def enqueue(self, kind, key, payload, image=None, depends_on=None):
+        now = time.time()
+
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO jobs "
+                "(key, kind, payload, image, depends_on, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    kind,
+                    json.dumps(payload),
+                    bytes(image) if image is not None else None,
+                    depends_on,
+                    now,
+                    now
+                )
+            )
+
+        self._wake.set()
+        return key
+
+    def result(self, key):
+        # The server's reply to a delivered job, or None while it is still
+        # pending (or has failed)
+        job = self._job(key)
+        if job is None or job[0] != "done":
+            return None
+        return json.loads(job[1])
+
+    def pending_count(self):
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'pending'"
+            ).fetchone()
+        return row[0]
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    # ==========================================================
+    # SENDER
+    # ==========================================================
+
+    def _run(self):
+        self._prune()
+
+        while True:
+            jobs = self._due_jobs()
+            if not jobs:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+
+            for job in jobs:
+                if not self._deliver(job):
+                    break
+            else:
+                self._failures = 0
+                continue
+
+            # Server unreachable: back off, unless new work wakes us early
+            self._failures += 1
+            delay = min(RETRY_MAX, RETRY_BASE * 2 ** (self._failures - 1))
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    def _due_jobs(self):
+        with self._db_lock:
+            return self._db.execute(
+                "SELECT key, kind, payload, image, depends_on FROM jobs "
+                "WHERE status = 'pending' ORDER BY id LIMIT ?",
+                (BATCH_SIZE,)
+            ).fetchall()
+
+    def _deliver(self, job):
+        # Returns False when the server could not be reached
+        key, kind, payload, image, depends_on = job
+        payload = json.loads(payload)
+
+        if depends_on:
+            parent = self._job(depends_on)
+
+            if parent is None or parent[0] == "failed":
+                self._mark_failed(key, "Patient registration could not be saved.")
+                return True
+
+            if parent[0] != "done":
+                # Jobs are sent in insertion order, so the parent is always
+                # attempted first; it failed to send this round.
+                return False
+
+            payload["user_id"] = json.loads(parent[1]).get("id")
+
+        try:
+            if kind == "create_user":
+                result = api.client.create_user(idempotency_key=key, **payload)
+            else:
+                result = api.client.analyze_sample(
+                    payload["user_id"],
+                    payload["age"],
+                    payload["gender"],
+                    image,
+                    idempotency_key=key
+                )
+
+        except Exception as e:
+            if api.is_unreachable(e):
+                self._bump_attempts(key, str(e))
+                return False
+
+            self._mark_failed(key, str(e))
+            return True
+
+        with self._db_lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'done', result = ?, image = NULL, "
+                "attempts = attempts + 1, updated = ? WHERE key = ?",
+                (json.dumps(result), time.time(), key)
+            )
+
+        self.delivered.emit(key, result)
+        return True
+
+    def _job(self, key):
+        with self._db_lock:
+            return self._db.execute(
+                "SELECT status, result FROM jobs WHERE key = ?",
+                (key,)
+            ).fetchone()
+
+    def _bump_attempts(self, key, error):
+        with self._db_lock:
+            self._db.execute(
+                "UPDATE jobs SET attempts = attempts + 1, error = ?, updated = ? "
+                "WHERE key = ?",
+                (error, time.time(), key)
+            )
+
+    def _mark_failed(self, key, error):
+        with self._db_lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, updated = ? "
+                "WHERE key = ?",
+                (error, time.time(), key)
+            )
+
+        self.failed.emit(key, error)
+
+    def _prune(self):
+        with self._db_lock:
+            self._db.execute(
+                "DELETE FROM jobs WHERE status = 'done' AND updated < ?",
+                (time.time() - KEEP_DONE_SECONDS,)
+            )
+
+
+_outbox = None
+
+
+def get_outbox():
+    global _outbox
+
+    if _outbox is None:
+        _outbox = Outbox()
+        _outbox.start()
+
+    return _outbox
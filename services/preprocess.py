@@ -0,0 +1,142 @@
+import time
+
+from PySide6.QtCore import QBuffer, QByteArray, QIODevice, QRect, Qt
+from PySide6.QtGui import QImage
+
+# Sample region of interest as fractions of the frame (x, y, width, height);
+# None keeps the full frame.
+SAMPLE_ROI = None
+# Downscale to fit the model's input size (width, height); None keeps the
+# captured resolution.
+MODEL_INPUT_SIZE = None
+# "jpg", "png" or "png-gray"; None uploads the captured JPEG unchanged
+# unless a crop or resize forces a re-encode.
+UPLOAD_FORMAT = None
+UPLOAD_QUALITY = 90
+
+CONTENT_TYPES = {
+    "jpg": "image/jpeg",
+    "png": "image/png",
+}
+
+
+# ==========================================================
+# STAGES
+# ==========================================================
+# A stage is any callable taking and returning a QImage.
+
+class CropStage:
+    def __init__(self, roi):
+        self.roi = roi
+
+    def __call__(self, image):
+        x, y, w, h = self.roi
+        rect = QRect(
+            int(x * image.width()),
+            int(y * image.height()),
+            int(w * image.width()),
+            int(h * image.height())
+        )
+        return image.copy(rect.intersected(image.rect()))
+
+
+class ResizeStage:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+    def __call__(self, image):
+        if image.width() <= self.width and image.height() <= self.height:
+            return image
+
+        return image.scaled(
+            self.width,
+            self.height,
+            Qt.KeepAspectRatio,
+            Qt.SmoothTransformation
+        )
+
+
+class GrayscaleStage:
+    def __call__(self, image):
+        return image.convertToFormat(QImage.Format_Grayscale8)
+
+
+class Encoder:
+    def __init__(self, fmt="jpg", quality=UPLOAD_QUALITY):
+        self.fmt = fmt
+        self.quality = quality
+
+    @property
+    def content_type(self):
+        return CONTENT_TYPES[self.fmt]
+
+    def __call__(self, image):
+        data = QByteArray()
+        buffer = QBuffer(data)
+        buffer.open(QIODevice.WriteOnly)
+
+        # PNG is lossless; Qt maps quality to zlib effort there
+        quality = self.quality if self.fmt == "jpg" else -1
+        if not image.save(buffer, self.fmt.upper(), quality):
+            raise Exception(f"Failed to encode sample as {self.fmt}")
+
+        buffer.close()
+        return data.data()
+
+
+# ==========================================================
+# PIPELINE
+# ==========================================================
+
+class Pipeline:
+    def __init__(self, stages=(), encoder=None):
+        self.stages = list(stages)
+        self.encoder = encoder
+
+    def process(self, jpeg):
+        # Returns (data, content_type, metrics)
+        started = time.perf_counter()
+        bytes_in = len(jpeg)
+
+        if not self.stages and self.encoder is None:
+            data, content_type = jpeg, "image/jpeg"
+        else:
+            image = QImage.fromData(jpeg)
+            if image.isNull():
+                raise Exception("Captured sample is not a valid image.")
+
+            for stage in self.stages:
+                image = stage(image)
+
+            encoder = self.encoder or Encoder()
+            data = encoder(image)
+            content_type = encoder.content_type
+
+        metrics = {
+            "bytes_in": bytes_in,
+            "bytes_out": len(data),
+            "bytes_saved": bytes_in - len(data),
+            "preprocess_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+        return data, content_type, metrics
+
+
+def default_pipeline():
+    stages = []
+
+    if SAMPLE_ROI:
+        stages.append(CropStage(SAMPLE_ROI))
+
+    if MODEL_INPUT_SIZE:
+        stages.append(ResizeStage(*MODEL_INPUT_SIZE))
+
+    encoder = None
+    if UPLOAD_FORMAT == "png-gray":
+        stages.append(GrayscaleStage())
+        encoder = Encoder("png")
+    elif UPLOAD_FORMAT:
+        encoder = Encoder(UPLOAD_FORMAT, UPLOAD_QUALITY)
+
+    return Pipeline(stages, encoder)
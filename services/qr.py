@@ -0,0 +1,39 @@
+import numpy as np
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QImage
+
+# Quiet zone around the code, in modules (the spec minimum)
+QR_BORDER = 4
+
+
+def render_qr(text, size):
+    # Renders text as a size x size grayscale QR code straight from the
+    # module matrix, without a PIL image or PNG in between. Modules are
+    # drawn a whole number of pixels wide so the code stays crisp; what
+    # is left over becomes white padding.
+    import qrcode  # only needed once a result is shown
+
+    qr = qrcode.QRCode(border=QR_BORDER)
+    qr.add_data(text)
+    qr.make(fit=True)
+
+    modules = np.array(qr.get_matrix(), dtype=bool)
+    scale = max(1, size // len(modules))
+
+    pixels = np.where(modules, 0, 255).astype(np.uint8)
+    pixels = pixels.repeat(scale, axis=0).repeat(scale, axis=1)
+
+    side = max(size, len(pixels))
+    offset = (side - len(pixels)) // 2
+
+    canvas = np.full((side, side), 255, np.uint8)
+    canvas[offset:offset + len(pixels), offset:offset + len(pixels)] = pixels
+
+    # copy() detaches the image from the numpy buffer
+    image = QImage(canvas.data, side, side, side, QImage.Format_Grayscale8).copy()
+
+    if side > size:
+        # More modules than pixels; only for unusually long URLs
+        image = image.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+    return image
@@ -0,0 +1,12 @@
+import os
+
+# Local state that must survive restarts (outbox, caches, logs)
+DATA_DIR = os.environ.get(
+    "PEESENSE_DATA_DIR",
+    os.path.join(os.path.expanduser("~"), ".peesense")
+)
+
+
+def data_path(name):
+    os.makedirs(DATA_DIR, exist_ok=True)
+    return os.path.join(DATA_DIR, name)
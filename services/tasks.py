@@ -0,0 +1,100 @@
+import threading
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, QTimer, Signal
+
+
+class TaskSignals(QObject):
+    progress = Signal(str)
+    finished = Signal(object)
+    failed = Signal(str)
+
+
+class ApiTask(QRunnable):
+    # Runs a blocking call (usually a services.api function) on the global
+    # thread pool. Exactly one of finished/failed is emitted, unless the
+    # task was cancelled first, in which case neither is and it is released
+    # right away.
+
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = TaskSignals()
+
+        # The exception behind a failure, for callers that need its type
+        self.error = None
+
+        self._lock = threading.Lock()
+        self._done = False
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            if self._finish():
+                self.error = e
+                self.signals.failed.emit(str(e))
+            return
+
+        if self._finish():
+            self.signals.finished.emit(result)
+
+    def _finish(self):
+        with self._lock:
+            if self._done:
+                return False
+            self._done = True
+            return True
+
+    @property
+    def done(self):
+        return self._done
+
+    def cancel(self):
+        # The underlying call cannot be interrupted; its outcome is dropped
+        if not self._finish():
+            return False
+
+        # A task still queued is never started. One already running is
+        # kept alive by its own run() until the call returns.
+        QThreadPool.globalInstance().tryTake(self)
+        _active.discard(self)
+        return True
+
+    def expire(self):
+        if self._finish():
+            self.error = TimeoutError("The server took too long to respond.")
+            self.signals.failed.emit(str(self.error))
+
+
+# Tasks stay referenced until they settle, so callers may fire and forget
+_active = set()
+
+
+def run_task(fn, *args, on_result=None, on_error=None, on_progress=None,
+             timeout_ms=None, progress=False, **kwargs):
+    # With progress=True, fn is called with a progress= callback that
+    # forwards stage messages to on_progress on the GUI thread.
+    task = ApiTask(fn, *args, **kwargs)
+    task.setAutoDelete(False)
+
+    if progress:
+        task.kwargs["progress"] = task.signals.progress.emit
+
+    if on_result:
+        task.signals.finished.connect(on_result)
+    if on_error:
+        task.signals.failed.connect(on_error)
+    if on_progress:
+        task.signals.progress.connect(on_progress)
+
+    _active.add(task)
+    task.signals.finished.connect(lambda _: _active.discard(task))
+    task.signals.failed.connect(lambda _: _active.discard(task))
+
+    if timeout_ms:
+        QTimer.singleShot(timeout_ms, task.expire)
+
+    QThreadPool.globalInstance().start(task)
+    return task
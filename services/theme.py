@@ -0,0 +1,279 @@
+# Application-wide style sheet, installed once with apply_theme(). Widgets
+# opt into a look with the "role" dynamic property instead of carrying
+# their own setStyleSheet() string, and state changes (such as a field
+# failing validation) flip a property and repolish just that widget.
+
+from PySide6.QtCore import Qt
+
+PRIMARY = "#2d63c8"
+PRIMARY_HOVER = "#1e4ea8"
+SECONDARY = "#9aa5b1"
+SECONDARY_HOVER = "#7f8a96"
+ACCENT = "#2563eb"
+ACCENT_HOVER = "#1e40af"
+DANGER = "#d9534f"
+DANGER_HOVER = "#b52b27"
+ERROR = "#d32f2f"
+BACKDROP = "#eef2f7"
+TEXT = "#1a2b49"
+TEXT_DARK = "#111827"
+MUTED = "#6b7280"
+BORDER = "#cfd9e6"
+
+STYLESHEET = f"""
+    /* ---------------- SURFACES ---------------- */
+    QWidget[role="backdrop"] {{
+        background-color: {BACKDROP};
+        color: {TEXT};
+    }}
+
+    QWidget[role="surface"] {{
+        background-color: white;
+        color: {TEXT_DARK};
+        font-family: "Segoe UI", Arial;
+    }}
+
+    QFrame[role="card"] {{
+        background-color: white;
+        border-radius: 16px;
+    }}
+
+    QFrame[role="card"][tone="muted"] {{
+        background-color: #f9fafb;
+    }}
+
+    QLabel[role="footer"] {{
+        background-color: {PRIMARY};
+        color: white;
+        padding: 10px;
+        font-size: 11px;
+    }}
+
+    QLabel[role="preview"] {{
+        background-color: {TEXT_DARK};
+        border-radius: 12px;
+    }}
+
+    /* ---------------- TEXT ---------------- */
+    QLabel[role="title"] {{
+        color: {PRIMARY};
+    }}
+
+    QLabel[role="title"][tone="dark"] {{
+        color: {TEXT};
+    }}
+
+    QLabel[role="subtitle"] {{
+        color: #3b4a6b;
+        font-size: 14px;
+    }}
+
+    QLabel[role="heading"] {{
+        color: {TEXT_DARK};
+        font-size: 15px;
+        font-weight: 600;
+    }}
+
+    QLabel[role="heading"][variant="large"] {{
+        color: #1f2937;
+        font-size: 20px;
+    }}
+
+    QLabel[role="caption"] {{
+        color: {MUTED};
+        font-size: 13px;
+    }}
+
+    QLabel[role="result"] {{
+        color: {TEXT_DARK};
+        font-size: 11px;
+    }}
+
+    QLabel[role="error"] {{
+        color: {ERROR};
+        font-size: 12px;
+    }}
+
+    /* ---------------- BUTTONS ---------------- */
+    QPushButton[role="primary"] {{
+        background-color: {PRIMARY};
+        color: white;
+        font-size: 14px;
+        border-radius: 8px;
+    }}
+
+    QPushButton[role="primary"]:hover {{
+        background-color: {PRIMARY_HOVER};
+    }}
+
+    QPushButton[role="secondary"] {{
+        background-color: {SECONDARY};
+        color: white;
+        font-size: 13px;
+        border-radius: 8px;
+    }}
+
+    QPushButton[role="secondary"]:hover {{
+        background-color: {SECONDARY_HOVER};
+    }}
+
+    QPushButton[role="close"] {{
+        background-color: {DANGER};
+        color: white;
+        border-radius: 13px;
+        font-weight: bold;
+        padding: 0px;
+    }}
+
+    QPushButton[role="close"]:hover {{
+        background-color: {DANGER_HOVER};
+    }}
+
+    QPushButton[role="action"] {{
+        background-color: {ACCENT};
+        color: white;
+        font-size: 14px;
+        border-radius: 10px;
+        min-height: 42px;
+        padding: 6px 14px;
+    }}
+
+    QPushButton[role="action"]:hover {{
+        background-color: {ACCENT_HOVER};
+    }}
+
+    QPushButton[role="action"]:disabled {{
+        background-color: #9ca3af;
+    }}
+
+    QPushButton[role="action"][variant="small"] {{
+        font-size: 11px;
+        border-radius: 6px;
+        min-height: 30px;
+    }}
+
+    QPushButton[role="link"] {{
+        background: transparent;
+        color: {PRIMARY};
+        font-size: 12px;
+        border: 1px dashed {PRIMARY};
+        border-radius: 8px;
+    }}
+
+    /* ---------------- INPUTS ---------------- */
+    QLineEdit[role="input"], QComboBox[role="input"] {{
+        border: 1px solid {BORDER};
+        border-radius: 6px;
+        padding: 6px;
+        font-size: 13px;
+        background: white;
+        color: {TEXT};
+    }}
+
+    QLineEdit[role="input"][error="true"],
+    QComboBox[role="input"][error="true"] {{
+        border: 2px solid {ERROR};
+    }}
+
+    QComboBox[role="input"] QAbstractItemView {{
+        background: white;
+        color: black;
+        selection-background-color: {PRIMARY};
+        selection-color: white;
+    }}
+
+    QLineEdit[role="search"] {{
+        border: 1px solid #d1d5db;
+        border-radius: 8px;
+        padding: 8px;
+        font-size: 13px;
+        background: white;
+        color: {TEXT_DARK};
+    }}
+
+    /* ---------------- LISTS ---------------- */
+    QListView[role="users"] {{
+        border: none;
+        background: transparent;
+        font-size: 13px;
+    }}
+
+    QListView[role="users"] QScrollBar:vertical {{
+        border: none;
+        background: transparent;
+        width: 6px;
+    }}
+
+    QListView[role="users"] QScrollBar::handle:vertical {{
+        background: #cbd5e1;
+        border-radius: 3px;
+    }}
+
+    /* ---------------- DIAGNOSTICS ---------------- */
+    QFrame[role="overlay"] {{
+        background-color: rgba(17, 24, 39, 220);
+        border-radius: 10px;
+    }}
+
+    QFrame[role="overlay"] QLabel {{
+        color: #e5e7eb;
+        font-size: 11px;
+    }}
+
+    /* ---------------- DIALOGS ---------------- */
+    QDialog[role="dialog"] {{
+        background-color: white;
+    }}
+
+    QDialog[role="dialog"] QLabel {{
+        color: {TEXT};
+        font-size: 12px;
+    }}
+
+    QDialog[role="dialog"] QLabel[role="heading"] {{
+        font-size: 13px;
+        font-weight: 600;
+    }}
+
+    QDialog[role="dialog"] QPushButton {{
+        border-radius: 6px;
+        font-size: 12px;
+    }}
+"""
+
+
+def apply_theme(app):
+    # Parsed once for the whole application. Fonts and text colours set on
+    # a screen's root flow down to its children, like the per-screen
+    # QWidget rules they replace.
+    app.setAttribute(Qt.AA_UseStyleSheetPropagationInWidgetStyles, True)
+    app.setStyleSheet(STYLESHEET)
+
+
+def set_role(widget, role, **properties):
+    # Tags a widget for a STYLESHEET rule. Call before the widget is first
+    # shown; later changes go through set_state().
+    widget.setProperty("role", role)
+    for name, value in properties.items():
+        widget.setProperty(name, value)
+    return widget
+
+
+def set_screen_role(widget, role):
+    # "backdrop" or "surface" for a screen's root. Plain QWidget
+    # subclasses only paint a style sheet background when asked to.
+    widget.setAttribute(Qt.WA_StyledBackground, True)
+    return set_role(widget, role)
+
+
+def set_state(widget, name, value):
+    # Flips a dynamic property and repolishes only this widget, which is
+    # far cheaper than replacing its style sheet
+    if widget.property(name) == value:
+        return
+
+    widget.setProperty(name, value)
+    style = widget.style()
+    style.unpolish(widget)
+    style.polish(widget)
+    widget.update()
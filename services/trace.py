@@ -0,0 +1,181 @@
+import atexit
+import json
+import os
+import queue
+import socket
+import threading
+import time
+import uuid
+
+from services.storage import data_path
+
+# One JSON line per patient session, from Next on the home screen to the
+# result screen's Home button (or to whichever step the patient gave up
+# at). Step times are seconds since the session started, taken from the
+# monotonic clock; "started" is wall-clock time for per-hour grouping.
+#
+# A relative name is kept under the data directory; empty disables
+# tracing. bench/sessions.py summarizes the files.
+TRACE_FILE = os.environ.get("PEESENSE_TRACE_FILE", "sessions.jsonl")
+
+# The file is rotated to .1 ... .ROTATE_KEEP once it grows past ROTATE_BYTES
+ROTATE_BYTES = 5 * 1024 * 1024
+ROTATE_KEEP = 5
+# Lines are buffered and written at most this long after the session ends
+FLUSH_INTERVAL = 2
+
+KIOSK = socket.gethostname()
+
+
+# ==========================================================
+# SESSIONS (GUI thread only)
+# ==========================================================
+
+class Session:
+    def __init__(self, idle):
+        self.id = uuid.uuid4().hex
+        self.started = time.time()
+        self.origin = time.monotonic()
+        # Time since the previous session ended; near zero when patients
+        # are queueing at the kiosk
+        self.idle = idle
+        self.steps = []
+
+    def step(self, name, **fields):
+        self.steps.append({
+            "step": name,
+            "t": round(time.monotonic() - self.origin, 4),
+            **fields
+        })
+
+    def record(self, outcome):
+        return {
+            "session": self.id,
+            "kiosk": KIOSK,
+            "started": round(self.started, 3),
+            "idle_before": None if self.idle is None else round(self.idle, 3),
+            "duration": round(time.monotonic() - self.origin, 4),
+            "outcome": outcome,
+            "steps": self.steps,
+        }
+
+
+_session = None
+_last_end = None
+
+
+def begin(step):
+    # A session left open is one the patient walked away from
+    global _session
+
+    if not TRACE_FILE:
+        return
+
+    if _session is not None:
+        end("abandoned")
+
+    idle = None if _last_end is None else time.monotonic() - _last_end
+    _session = Session(idle)
+    _session.step(step)
+
+
+def step(name, **fields):
+    if _session is not None:
+        _session.step(name, **fields)
+
+
+def end(outcome):
+    global _session, _last_end
+
+    if _session is None:
+        return
+
+    _session.step(outcome)
+    _writer().write(_session.record(outcome))
+
+    _session = None
+    _last_end = time.monotonic()
+
+
+# ==========================================================
+# WRITER
+# ==========================================================
+
+class TraceWriter:
+    # Appends records on a background thread, so a slow SD card never
+    # stalls the UI. Records that pile up are written in one go.
+
+    def __init__(self, path):
+        self.path = path
+        self._queue = queue.Queue()
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, record):
+        self._queue.put(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=FLUSH_INTERVAL * 2)
+
+    def _run(self):
+        while True:
+            line = self._queue.get()
+            if line is None:
+                return
+
+            lines = [line]
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            closing = False
+
+            # Gather whatever else arrives before the flush is due
+            while not closing:
+                try:
+                    line = self._queue.get(
+                        timeout=max(deadline - time.monotonic(), 0)
+                    )
+                except queue.Empty:
+                    break
+                if line is None:
+                    closing = True
+                else:
+                    lines.append(line)
+
+            self._append("".join(lines))
+            if closing:
+                return
+
+    def _append(self, data):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+            with open(self.path, "a") as f:
+                f.write(data)
+                size = f.tell()
+
+            if size >= ROTATE_BYTES:
+                self._rotate()
+
+        except OSError as e:
+            print("Failed to write session trace:", e)
+
+    def _rotate(self):
+        for n in range(ROTATE_KEEP - 1, 0, -1):
+            older = f"{self.path}.{n}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{n + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+
+_trace_writer = None
+
+
+def _writer():
+    global _trace_writer
+
+    if _trace_writer is None:
+        _trace_writer = TraceWriter(data_path(TRACE_FILE))
+
+    return _trace_writer
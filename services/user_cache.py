@@ -0,0 +1,276 @@
+import json
+import os
+import threading
+import time
+
+from PySide6.QtCore import QObject, Signal
+
+from services import api
+from services.storage import data_path
+from services.tasks import run_task
+from services.user_search import UserRow, normalize_user
+
+# A visit within this many seconds of the last sync uses the cache as-is
+REFRESH_INTERVAL = 300
+# Users per request when the server supports paging
+PAGE_SIZE = 200
+# While a first download streams in, the list is shown after this many
+# users and again each time the count doubles
+FIRST_BATCH = 100
+
+
+class UserCache(QObject):
+    # Registered users as returned by GET /users, kept in memory as compact
+    # UserRow objects and on disk. The disk copy makes the list available instantly after boot;
+    # refreshes are conditional GETs on a worker thread.
+    #
+    # Servers that page /users are synced one page at a time: refresh()
+    # fetches the first page and fetch_more() the next one, as the user
+    # scrolls. Servers that do not page return the whole table at once.
+    changed = Signal()
+    # Partial list from a streaming download, emitted on a pool thread
+    _received = Signal(object)
+
+    def __init__(self, path=None):
+        super().__init__()
+        self.path = path or data_path("users.json")
+
+        self.server_users = []
+        # Registered on this kiosk and not yet seen in a server response
+        self.local_users = []
+        # Server-side user count, or None when the whole table is loaded
+        self.total = None
+        # Offset of the next page
+        self.offset = 0
+        self.etag = None
+        self.last_modified = None
+        self.synced_at = 0
+
+        self._refreshing = False
+        # Rows held before a streaming download started showing its own
+        self._before_stream = None
+        self._fetching_page = False
+        self._received.connect(self._rows_received)
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        self.server_users = [
+            # Caches written before rows were stored compactly hold dicts
+            normalize_user(u) if isinstance(u, dict) else UserRow(*u)
+            for u in state.get("users", [])
+        ]
+        self.total = state.get("total")
+        self.offset = state.get("offset", len(self.server_users))
+        self.etag = state.get("etag")
+        self.last_modified = state.get("last_modified")
+
+    def _save(self, state):
+        # Refreshes and page loads may save concurrently from the pool
+        tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+
+        state = dict(state, users=[
+            [row.id, row.full_name, row.age, row.gender]
+            for row in state["users"]
+        ])
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+
+        os.replace(tmp_path, self.path)
+
+    def _state(self):
+        return {
+            "users": self.server_users,
+            "total": self.total,
+            "offset": self.offset,
+            "etag": self.etag,
+            "last_modified": self.last_modified
+        }
+
+    @property
+    def users(self):
+        return self.server_users + self.local_users
+
+    @property
+    def complete(self):
+        # True when every user on the server is in self.users
+        return self.total is None or self.offset >= self.total
+
+    # ==========================================================
+    # SYNC
+    # ==========================================================
+
+    def is_stale(self):
+        return time.monotonic() - self.synced_at > REFRESH_INTERVAL
+
+    def refresh(self, force=False):
+        if self._refreshing or not (force or self.is_stale()):
+            return
+
+        self._refreshing = True
+        self._before_stream = (self.server_users, self.offset)
+        run_task(
+            self._fetch,
+            self.etag,
+            self.last_modified,
+            # Progressive display only helps while there is nothing to show
+            not self.server_users,
+            on_result=self._fetched,
+            on_error=self._fetch_failed
+        )
+
+    def _fetch(self, etag, last_modified, progressive):
+        # Runs on the thread pool, disk write included. A full table is
+        # normalized row by row as it streams in, so the response body and
+        # its dicts are never held in memory all at once.
+        users, total, etag, last_modified = api.client.get_users_if_changed(
+            etag,
+            last_modified,
+            limit=PAGE_SIZE
+        )
+
+        if users is None:
+            return None, None, etag, last_modified
+
+        rows = []
+        next_batch = FIRST_BATCH
+
+        for user in users:
+            rows.append(normalize_user(user))
+
+            if progressive and len(rows) >= next_batch:
+                self._received.emit(rows[:])
+                next_batch *= 2
+
+        # A first page is merged into the pages already held, and saved
+        # once that is done on the GUI thread
+        if total is None:
+            self._save({
+                "users": rows,
+                "total": total,
+                "offset": len(rows),
+                "etag": etag,
+                "last_modified": last_modified
+            })
+
+        return rows, total, etag, last_modified
+
+    def _rows_received(self, rows):
+        if not self._refreshing:
+            return
+
+        self.server_users = rows
+        self.offset = len(rows)
+        self._merge_local()
+        self.changed.emit()
+
+    def _fetched(self, result):
+        users, total, self.etag, self.last_modified = result
+        self._refreshing = False
+        self._before_stream = None
+        self.synced_at = time.monotonic()
+
+        # 304: the first page is unchanged, so are the pages after it
+        if users is None:
+            return
+
+        if total is None:
+            self.server_users = users
+            self.offset = len(users)
+        else:
+            # Keep the pages loaded since with fetch_more(); the first page
+            # replaces its own rows and the rest stay until a page reload
+            # brings in the server's copy
+            fresh = {row.id for row in users}
+            self.server_users = users + [
+                row for row in self.server_users if row.id not in fresh
+            ]
+            self.offset = max(self.offset, len(users))
+            run_task(self._save, self._state())
+
+        self.total = total
+        self._merge_local()
+        self.changed.emit()
+
+    def _fetch_failed(self, message):
+        self._refreshing = False
+        print("Failed to refresh users:", message)
+
+        # A download cut off midway must not pass for the whole table (with
+        # total None, complete would say it is); go back to what was held
+        # before. synced_at is untouched, so the next visit fetches again.
+        before, self._before_stream = self._before_stream, None
+        if before is not None and before[0] is not self.server_users:
+            self.server_users, self.offset = before
+            self._merge_local()
+            self.changed.emit()
+
+    def fetch_more(self):
+        # Loads the next page from a paging server
+        if self.complete or self._fetching_page or self._refreshing:
+            return
+
+        self._fetching_page = True
+        run_task(
+            api.client.get_users_page,
+            PAGE_SIZE,
+            self.offset,
+            on_result=self._page_fetched,
+            on_error=self._page_failed
+        )
+
+    def _page_fetched(self, result):
+        users, total = result
+        self._fetching_page = False
+
+        # Users registered since the previous page shift the pages, so a
+        # page can overlap the one before it
+        known = {row.id for row in self.server_users}
+        self.server_users = self.server_users + [
+            row for row in map(normalize_user, users) if row.id not in known
+        ]
+        self.offset += len(users)
+        # An empty page means the server has nothing more, whatever it said
+        self.total = total if users else self.offset
+
+        self._merge_local()
+        run_task(self._save, self._state())
+        self.changed.emit()
+
+    def _page_failed(self, message):
+        self._fetching_page = False
+        print("Failed to load more users:", message)
+
+    def add_local(self, user):
+        # Show a user registered on this kiosk right away, until a sync
+        # brings in the server's copy
+        row = normalize_user(user)
+        if any(u.id == row.id for u in self.users):
+            return
+
+        self.local_users.append(row)
+        self.changed.emit()
+
+    def _merge_local(self):
+        known = {row.id for row in self.server_users}
+        self.local_users = [
+            row for row in self.local_users if row.id not in known
+        ]
+
+
+_cache = None
+
+
+def get_user_cache():
+    global _cache
+
+    if _cache is None:
+        _cache = UserCache()
+
+    return _cache
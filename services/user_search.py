@@ -0,0 +1,80 @@
+import heapq
+from bisect import bisect_left
+
+# Results shown per page; "Show more" extends the list by this many
+TOP_K = 50
+
+
+class UserRow:
+    # One registered user as shown in the list. Slots keep 100k rows to a
+    # few megabytes, against a dict per user.
+    __slots__ = ("id", "full_name", "age", "gender")
+
+    def __init__(self, id, full_name, age, gender):
+        self.id = id
+        self.full_name = full_name
+        self.age = age
+        self.gender = gender
+
+
+def normalize_user(raw):
+    firstname = (raw.get("firstname") or "").strip()
+    middlename = (raw.get("middlename") or "").strip()
+    lastname = (raw.get("lastname") or "").strip()
+
+    full_name = " ".join(f"{firstname} {middlename} {lastname}".split())
+
+    return UserRow(raw.get("id"), full_name, raw.get("age"), raw.get("gender"))
+
+
+class UserIndex:
+    # Prefix index over the name tokens (first, middle and last name) of
+    # user rows. Tokens are kept in one sorted list, so all tokens starting
+    # with a prefix form a contiguous range found by bisection. A query
+    # matches a user when every query word is a prefix of one of the
+    # user's name tokens.
+
+    def __init__(self, rows):
+        self.rows = sorted(rows, key=lambda row: row.full_name.lower())
+        self._names = [row.full_name.lower() for row in self.rows]
+
+        entries = sorted(
+            (token, i)
+            for i, name in enumerate(self._names)
+            for token in set(name.split())
+        )
+        self._tokens = [token for token, _ in entries]
+        self._positions = [i for _, i in entries]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _prefix(self, prefix):
+        lo = bisect_left(self._tokens, prefix)
+        hi = bisect_left(self._tokens, prefix + "\uffff", lo)
+        return set(self._positions[lo:hi])
+
+    def search(self, text, limit=TOP_K):
+        # Returns (positions in self.rows of the best `limit` matches,
+        # total number of matches)
+        query = " ".join(text.lower().split())
+        if not query:
+            return list(range(min(limit, len(self.rows)))), len(self.rows)
+
+        terms = query.split()
+
+        # Longest terms are usually the most selective; intersect those first
+        matches = None
+        for term in sorted(terms, key=len, reverse=True):
+            found = self._prefix(term)
+            matches = found if matches is None else matches & found
+            if not matches:
+                return [], 0
+
+        def rank(i):
+            name = self._names[i]
+            exact = sum(term in name.split() for term in terms)
+            # Whole-name prefix first, then whole-word hits, then A-Z
+            return (not name.startswith(query), -exact, i)
+
+        return heapq.nsmallest(limit, matches, key=rank), len(matches)
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from services.json_stream import iter_json
+
+DOCUMENTS = [
+    "[]",
+    " [ ] ",
+    "[1,2.5,-3e2,4E-1,0.125e+2,6]",
+    '[{"id": 1, "name": "Ana"}, {"id": 2, "name": "Jos\\u00e9"}, []]',
+    '[true, false, null, "x", 10]',
+    '["ñandú", {"nested": [1, [2, [3.75]]]}, -0.5]',
+]
+
+
+def byte_chunks(text):
+    data = text.encode()
+    return [data[i:i + 1] for i in range(len(data))]
+
+
+def read(chunks):
+    items, value = iter_json(chunks)
+    return list(items) if items is not None else value
+
+
+@pytest.mark.parametrize("text", DOCUMENTS)
+def test_array_one_byte_per_chunk(text):
+    assert read(byte_chunks(text)) == json.loads(text)
+
+
+@pytest.mark.parametrize("text", DOCUMENTS)
+def test_array_in_one_chunk(text):
+    assert read([text.encode()]) == json.loads(text)
+
+
+def test_number_split_inside_fraction():
+    assert read([b"[1,", b"2", b".", b"5]"]) == [1, 2.5]
+
+
+def test_number_split_before_exponent():
+    assert read([b"[7", b"e", b"+", b"2, 8]"]) == [700.0, 8]
+
+
+def test_items_yielded_before_the_array_ends():
+    def chunks():
+        yield b'[{"id": 1}, '
+        seen.append("second chunk")
+        yield b'{"id": 2}]'
+
+    seen = []
+    items, _ = iter_json(chunks())
+
+    assert next(items) == {"id": 1}
+    assert seen == []
+    assert list(items) == [{"id": 2}]
+    assert seen == ["second chunk"]
+
+
+def test_object_document_one_byte_per_chunk():
+    text = '{"users": [1, 2.5], "total": 2}'
+    assert read(byte_chunks(text)) == json.loads(text)
+
+
+def test_unterminated_array_raises():
+    with pytest.raises(json.JSONDecodeError):
+        read(byte_chunks("[1, 2"))